@@ -6,6 +6,51 @@ JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Database Connection Pool Configuration
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue").lower()  # "queue" (pooled) or "null" (no pooling)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # Persistent connections per worker
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Extra connections allowed during bursts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+
+# Password Hashing Pool Configuration
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_POOL_MAX_QUEUE = int(os.getenv("HASH_POOL_MAX_QUEUE", "32"))  # Waiting jobs before requests get 503
+
+# Authenticated User Cache
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # Seconds a resolved user stays cached
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Test Definition Cache
+TEST_CACHE_TTL = float(os.getenv("TEST_CACHE_TTL", "300"))  # Upper bound on staleness across workers
+TEST_CACHE_SIZE = int(os.getenv("TEST_CACHE_SIZE", "500"))
+
+# Submission Grading
+GRADING_MODE = os.getenv("GRADING_MODE", "sync").lower()  # "sync" (analyze in the request) or "async" (202 + job)
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", "4"))  # Concurrent analyses per worker process
+
+# Test Leaderboard Cache
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "60"))  # Bounds staleness across workers
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", "200"))
+
+# GDPI Question Bank Cache
+GDPI_BANK_TTL = float(os.getenv("GDPI_BANK_TTL", "300"))  # Upper bound on staleness across workers
+
+# GDPI Keyword Matcher Cache
+GDPI_MATCHER_CACHE_SIZE = int(os.getenv("GDPI_MATCHER_CACHE_SIZE", "1000"))  # Compiled matchers kept per worker
+
+# GDPI Rescoring
+GDPI_RESCORE_WORKERS = int(os.getenv("GDPI_RESCORE_WORKERS", str(min(4, os.cpu_count() or 1))))  # Scoring processes
+GDPI_RESCORE_BATCH_SIZE = int(os.getenv("GDPI_RESCORE_BATCH_SIZE", "2000"))  # Responses per checkpointed batch
+
+# Item Analysis
+ITEM_STATS_FOLD_INTERVAL = float(os.getenv("ITEM_STATS_FOLD_INTERVAL", "30"))  # Seconds between folds of logged item stat changes
+
+# Answer Autosave
+DRAFT_FLUSH_INTERVAL = float(os.getenv("DRAFT_FLUSH_INTERVAL", "2"))  # Seconds between batched draft writes
+DRAFT_FLUSH_SIZE = int(os.getenv("DRAFT_FLUSH_SIZE", "1000"))  # Buffered drafts that trigger an early flush
+
 # CORS Configuration
 ALLOWED_ORIGINS = [
     "http://localhost",
@@ -15,9 +60,16 @@ ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
+# Pagination
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
 # Weak Topic Threshold
 WEAK_TOPIC_THRESHOLD = 70.0  # Percentage below which a topic is considered weak
 
+# Topic Mastery Trend
+MASTERY_EWMA_ALPHA = float(os.getenv("MASTERY_EWMA_ALPHA", "0.4"))  # Weight of the newest test score
+
 # Domain Keywords for Placement Segregation
 DOMAIN_KEYWORDS = {
     "Web": ["react", "vue", "angular", "nodejs", "fastapi", "django", "html", "css", "javascript", "typescript", "web development"],
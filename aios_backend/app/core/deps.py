@@ -1,18 +1,67 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthCredentials
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import USER_CACHE_TTL, USER_CACHE_SIZE
 from app.core.security import decode_token
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.user import User, UserRole
 from app.services.auth_service import get_user_by_id
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """Identity and role of the authenticated user; load the User row where more is needed"""
+    id: int
+    email: str
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, role=user.role)
+
+
+# Resolved identities keyed by (user_id, token)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def invalidate_user(user_id: int):
+    """Drop every cached entry for a user"""
+    user_cache.invalidate(lambda key: key[0] == user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember users updated or deleted in this transaction"""
+    changed = {
+        obj.id for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, User)
+    }
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    """Invalidate cached users once their changes are committed"""
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
 async def get_current_user(
     credentials: HTTPAuthCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
     """Get current authenticated user from JWT token"""
     token = credentials.credentials
     
@@ -32,7 +81,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_id(db, user_id)
+    cache_key = (user_id, token)
+    user = user_cache.get(cache_key)
+    if user is not None:
+        return user
+    
+    user = await get_user_by_id(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,12 +94,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    current_user = CurrentUser.from_user(user)
+    user_cache.set(cache_key, current_user)
+    return current_user
 
 
 def require_role(*roles: UserRole):
     """Dependency to require specific user role(s)"""
-    async def check_role(current_user: User = Depends(get_current_user)) -> User:
+    async def check_role(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -57,7 +113,7 @@ def require_role(*roles: UserRole):
 
 
 # Specific role requirements
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Require admin role"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -67,7 +123,7 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_faculty(current_user: User = Depends(get_current_user)) -> User:
+def require_faculty(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Require faculty role"""
     if current_user.role != UserRole.FACULTY:
         raise HTTPException(
@@ -77,7 +133,7 @@ def require_faculty(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_student(current_user: User = Depends(get_current_user)) -> User:
+def require_student(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Require student role"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(
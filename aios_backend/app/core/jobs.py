@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """Progress record for a background job running in this worker"""
+    id: str
+    kind: str
+    owner_id: Optional[int] = None  # User the job runs for, when only they may poll it
+    status: str = "queued"  # queued, running, completed, failed
+    progress: float = 0.0  # 0.0 - 1.0
+    message: str = ""
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def update(self, progress: float, message: str = ""):
+        self.progress = round(min(max(progress, 0.0), 1.0), 4)
+        if message:
+            self.message = message
+
+
+class JobRegistry:
+    """
+    In-process registry of background jobs
+    Keeps the most recent max_jobs records so finished jobs can be polled.
+    """
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks = set()
+
+    def create(self, kind: str, owner_id: Optional[int] = None) -> Job:
+        job = Job(id=uuid.uuid4().hex, kind=kind, owner_id=owner_id)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def start(self, job: Job, func: Callable[[Job], Awaitable[dict]]) -> Job:
+        """Run func(job) as a task on the current event loop"""
+        task = asyncio.create_task(self.run(job, func))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def run(self, job: Job, func: Callable[[Job], Awaitable[dict]]):
+        """Run func(job) in the calling task, recording its outcome on the job"""
+        job.status = "running"
+        try:
+            job.result = await func(job)
+            job.status = "completed"
+            job.update(1.0, "Done")
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"tracked": len(self._jobs), "running_tasks": len(self._tasks), "by_status": counts}
+
+
+jobs = JobRegistry()
@@ -1,13 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import threading
+import time
 import jwt
 from passlib.context import CryptContext
-from app.core.config import JWT_SECRET, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import (
+    JWT_SECRET, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    HASH_POOL_WORKERS, HASH_POOL_MAX_QUEUE,
+)
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+class HashPoolSaturated(Exception):
+    """Raised when the password hashing pool cannot accept more work"""
+
+
+class PasswordHashPool:
+    """
+    Bounded worker pool for bcrypt so hashing never runs on the event loop.
+    bcrypt releases the GIL while hashing, so threads give real parallelism.
+    Jobs beyond workers + max_queue are rejected immediately instead of
+    piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Done-callbacks run on the executor threads
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    async def run(self, func, *args):
+        """Run a hashing function in the pool, or raise HashPoolSaturated"""
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashPoolSaturated("Password hashing is at capacity, retry shortly")
+            self._in_flight += 1
+
+        start = time.perf_counter()
+        future = self._executor.submit(func, *args)
+        # Count the job until its thread finishes, even if the caller is cancelled
+        future.add_done_callback(lambda _: self._finish(start))
+        return await asyncio.wrap_future(future)
+
+    def _finish(self, start: float):
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def stats(self) -> dict:
+        avg_latency = self.total_latency / self.completed if self.completed else 0.0
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_latency_ms": round(avg_latency * 1000, 3),
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+        }
+
+
+hash_pool = PasswordHashPool(HASH_POOL_WORKERS, HASH_POOL_MAX_QUEUE)
+
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     return pwd_context.hash(password)
@@ -18,6 +88,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """Hash a password in the bounded hashing pool"""
+    return await hash_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the bounded hashing pool"""
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
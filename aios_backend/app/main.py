@@ -1,7 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import init_db
+from app.core.database import init_db, get_pool_stats
 from app.core.config import ALLOWED_ORIGINS
+from app.core.security import hash_pool
+from app.core.deps import user_cache
+from app.services.test_cache import test_cache
+from app.services.leaderboard_service import leaderboard_cache
+from app.services.gdpi_bank import bank_cache
+from app.services.gdpi_service import matcher_cache
+from app.services.grading_service import grading_queue
+from app.services.draft_service import draft_buffer
+from app.services.item_analysis_service import item_stats_folder
+from app.core.jobs import jobs
 from app.routes import auth, tests, gdpi, placement, certificates
 
 # Initialize database
@@ -31,6 +41,12 @@ app.include_router(placement.router)
 app.include_router(certificates.router)
 
 
+@app.on_event("shutdown")
+async def flush_draft_answers():
+    """Write buffered autosaves before the worker exits"""
+    await draft_buffer.flush()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -51,6 +67,24 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def runtime_metrics():
+    """Runtime metrics for this worker process"""
+    return {
+        "db_pool": get_pool_stats(),
+        "password_hashing": hash_pool.stats(),
+        "user_cache": user_cache.stats(),
+        "test_cache": test_cache.stats(),
+        "leaderboard_cache": leaderboard_cache.stats(),
+        "gdpi_question_bank": bank_cache.stats(),
+        "gdpi_matcher_cache": matcher_cache.stats(),
+        "jobs": jobs.stats(),
+        "grading_queue": grading_queue.stats(),
+        "draft_buffer": draft_buffer.stats(),
+        "item_stats_folder": item_stats_folder.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
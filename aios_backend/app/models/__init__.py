@@ -1,20 +1,36 @@
 from .base import Base
 from .user import User
-from .test import Test, Question, Answer
-from .weak_topic import WeakTopicReport
-from .gdpi import GDPIQuestion, GDPIResponse
+from .topic import Topic
+from .test import (
+    Test, Question, Answer, TestResult, QuestionStat, QuestionOptionCount,
+    QuestionStatDelta, QuestionOptionDelta, DraftAnswer,
+)
+from .weak_topic import WeakTopicReport, TopicScore, TopicRollup, TopicRollupChange, TopicMastery
+from .gdpi import GDPIQuestion, GDPIResponse, GDPIRescoreCheckpoint
 from .placement import PlacementProfile
 from .certificate import Certificate
 
 __all__ = [
     "Base",
     "User",
+    "Topic",
     "Test",
     "Question",
     "Answer",
+    "TestResult",
+    "QuestionStat",
+    "QuestionOptionCount",
+    "QuestionStatDelta",
+    "QuestionOptionDelta",
+    "DraftAnswer",
     "WeakTopicReport",
+    "TopicScore",
+    "TopicRollup",
+    "TopicRollupChange",
+    "TopicMastery",
     "GDPIQuestion",
     "GDPIResponse",
+    "GDPIRescoreCheckpoint",
     "PlacementProfile",
     "Certificate",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
 from datetime import datetime
 from .base import Base
 
@@ -19,6 +19,9 @@ class GDPIQuestion(Base):
 
 class GDPIResponse(Base):
     __tablename__ = "gdpi_responses"
+    __table_args__ = (
+        Index("ix_gdpi_responses_student_id", "student_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -31,3 +34,18 @@ class GDPIResponse(Base):
 
     def __repr__(self):
         return f"<GDPIResponse(id={self.id}, student_id={self.student_id}, score={self.score})>"
+
+
+class GDPIRescoreCheckpoint(Base):
+    """Progress of rescoring a question's responses, so an interrupted job can resume"""
+    __tablename__ = "gdpi_rescore_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("gdpi_questions.id"), unique=True, nullable=False)
+    keywords = Column(Text, nullable=False)  # Keyword JSON being applied; a change restarts the rescore
+    last_response_id = Column(Integer, default=0, nullable=False)  # Responses up to this id are rescored
+    rescored = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<GDPIRescoreCheckpoint(question_id={self.question_id}, last_response_id={self.last_response_id})>"
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
+from .topic import TopicMixin
 
 
 class Test(Base):
@@ -20,13 +21,12 @@ class Test(Base):
         return f"<Test(id={self.id}, title={self.title})>"
 
 
-class Question(Base):
+class Question(TopicMixin, Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
     test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
     question_text = Column(Text, nullable=False)
-    topic = Column(String(100), nullable=False)  # e.g., "Mathematics", "Physics"
     correct_answer = Column(Text, nullable=False)
     options = Column(Text, nullable=True)  # JSON string of options
     difficulty = Column(String(50), default="medium", nullable=False)
@@ -41,6 +41,9 @@ class Question(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        UniqueConstraint("student_id", "question_id", "attempt", name="uq_answers_student_question_attempt"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
@@ -48,9 +51,128 @@ class Answer(Base):
     test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
     student_answer = Column(Text, nullable=False)
     is_correct = Column(Integer, default=0, nullable=False)  # 1 for correct, 0 for incorrect
+    attempt = Column(Integer, default=1, nullable=False)  # Re-answering within an attempt overwrites the row
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     question = relationship("Question", back_populates="answers")
 
     def __repr__(self):
         return f"<Answer(id={self.id}, question_id={self.question_id}, student_id={self.student_id})>"
+
+
+class TestResult(Base):
+    """Materialized analysis of a student's test, recomputed only when answers change"""
+    __tablename__ = "test_results"
+    __table_args__ = (
+        UniqueConstraint("student_id", "test_id", name="uq_test_results_student_test"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
+    answers_version = Column(Integer, default=0, nullable=False)  # Bumped on every answer submission
+    analyzed_version = Column(Integer, default=-1, nullable=False)  # answers_version the analysis reflects
+    attempt = Column(Integer, default=1, nullable=False)  # Current attempt; analysis covers only its answers
+    overall_score = Column(Float, default=0.0, nullable=False)  # Percentage
+    total_questions = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+    score_breakdown = Column(Text, nullable=True)  # JSON dict of topic scores
+    recommendation_message = Column(Text, nullable=True)
+    item_stats_counted = Column(Integer, default=0, nullable=False)  # 1 once the answers are in question_stats
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<TestResult(student_id={self.student_id}, test_id={self.test_id}, score={self.overall_score})>"
+
+
+class QuestionStat(Base):
+    """
+    Running sums for item analysis of one question, updated as answers are graded
+    A student's test score is their number of correct answers on the test.
+    """
+    __tablename__ = "question_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), unique=True, nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), index=True, nullable=False)
+    responses = Column(Integer, default=0, nullable=False)  # Students who answered
+    correct = Column(Integer, default=0, nullable=False)  # Students who answered correctly
+    score_sum = Column(Integer, default=0, nullable=False)  # Sum of respondents' test scores
+    score_sq_sum = Column(Integer, default=0, nullable=False)  # Sum of squared test scores
+    correct_score_sum = Column(Integer, default=0, nullable=False)  # Sum of test scores of correct respondents
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<QuestionStat(question_id={self.question_id}, responses={self.responses}, correct={self.correct})>"
+
+
+class QuestionOptionCount(Base):
+    """How many students currently pick each option of a multiple choice question"""
+    __tablename__ = "question_option_counts"
+    __table_args__ = (
+        UniqueConstraint("question_id", "option", name="uq_question_option_counts_question_option"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), index=True, nullable=False)
+    option = Column(Text, nullable=False)  # Normalized option text
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<QuestionOptionCount(question_id={self.question_id}, option={self.option}, count={self.count})>"
+
+
+class QuestionStatDelta(Base):
+    """
+    Change to a question's QuestionStat sums from one submission, not yet folded in
+    Submissions only append these, so they never wait on each other's
+    QuestionStat rows; they are folded in on read and periodically.
+    """
+    __tablename__ = "question_stat_deltas"
+
+    id = Column(Integer, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), index=True, nullable=False)
+    responses = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Integer, default=0, nullable=False)
+    score_sq_sum = Column(Integer, default=0, nullable=False)
+    correct_score_sum = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<QuestionStatDelta(question_id={self.question_id}, responses={self.responses})>"
+
+
+class QuestionOptionDelta(Base):
+    """Change to a QuestionOptionCount from one submission, not yet folded in"""
+    __tablename__ = "question_option_deltas"
+
+    id = Column(Integer, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), index=True, nullable=False)
+    option = Column(Text, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<QuestionOptionDelta(question_id={self.question_id}, option={self.option}, count={self.count})>"
+
+
+class DraftAnswer(Base):
+    """Latest autosaved answer to a question, kept until the answer is submitted"""
+    __tablename__ = "draft_answers"
+    __table_args__ = (
+        UniqueConstraint("student_id", "question_id", name="uq_draft_answers_student_question"),
+        Index("ix_draft_answers_student_test", "student_id", "test_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    student_answer = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<DraftAnswer(student_id={self.student_id}, question_id={self.question_id})>"
@@ -0,0 +1,174 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, event, select
+from sqlalchemy.orm import Session, declared_attr
+from typing import Dict, Iterable, Optional
+import threading
+from .base import Base
+
+
+class Topic(Base):
+    """Dictionary of topic names; other tables store the small integer id"""
+    __tablename__ = "topics"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<Topic(id={self.id}, name={self.name})>"
+
+
+class TopicRegistry:
+    """
+    In-process id <-> name map for the topics table
+    Topics are never renamed or deleted, so entries never go stale; topics
+    created by other workers are fetched the first time they are seen.
+    Topics created in a transaction are staged in its session and only
+    enter the map once it commits.
+    """
+
+    def __init__(self):
+        self._names: Dict[int, str] = {}
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def name(self, topic_id: int) -> Optional[str]:
+        return self._names.get(topic_id)
+
+    def id(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def _remember(self, rows: Iterable) -> None:
+        with self._lock:
+            for topic_id, name in rows:
+                self._names[topic_id] = name
+                self._ids[name] = topic_id
+
+    @staticmethod
+    def _staged(db) -> Dict[str, int]:
+        """Topics created by the session's open transaction, name -> id"""
+        return db.info.get("staged_topics", {})
+
+    @staticmethod
+    def _stage(db, rows: Iterable) -> None:
+        staged = db.info.setdefault("staged_topics", {})
+        for topic_id, name in rows:
+            staged[name] = topic_id
+
+    def _insert(self, db, names) -> object:
+        from app.core.database import upsert_insert
+        # RETURNING yields only the rows this statement created
+        return upsert_insert(db, Topic).values(
+            [{"name": name} for name in names]
+        ).on_conflict_do_nothing(index_elements=["name"]).returning(Topic.id, Topic.name)
+
+    def _missing(self, db, names: Iterable[str]) -> set:
+        return set(names) - self._ids.keys() - self._staged(db).keys()
+
+    def _resolve(self, db, names: Iterable[str]) -> Dict[str, int]:
+        staged = self._staged(db)
+        return {name: self._ids[name] if name in self._ids else staged[name] for name in names}
+
+    async def ensure(self, db, topic_ids: Iterable[int]) -> None:
+        """Make sure names for the given ids are in the map"""
+        missing = {topic_id for topic_id in topic_ids if topic_id not in self._names}
+        missing -= set(self._staged(db).values())
+        if missing:
+            self._remember((await db.execute(
+                select(Topic.id, Topic.name).where(Topic.id.in_(missing))
+            )).all())
+
+    async def lookup(self, db, names: Iterable[str]) -> Dict[str, int]:
+        """Get ids for existing topic names; unknown names are left out"""
+        names = set(names)
+        missing = self._missing(db, names)
+        if missing:
+            self._remember((await db.execute(
+                select(Topic.id, Topic.name).where(Topic.name.in_(missing))
+            )).all())
+        staged = self._staged(db)
+        return self._resolve(db, [name for name in names if name in self._ids or name in staged])
+
+    async def intern(self, db, names: Iterable[str]) -> Dict[str, int]:
+        """Get ids for topic names, creating topics that don't exist yet"""
+        names = set(names)
+        missing = self._missing(db, names)
+        if missing:
+            created = (await db.execute(self._insert(db, missing))).all()
+            self._stage(db, created)
+            existing = missing - {name for _, name in created}
+            if existing:
+                self._remember((await db.execute(
+                    select(Topic.id, Topic.name).where(Topic.name.in_(existing))
+                )).all())
+        return self._resolve(db, names)
+
+    def intern_sync(self, session: Session, names: Iterable[str]) -> Dict[str, int]:
+        """intern() for a synchronous session, used while flushing"""
+        names = set(names)
+        missing = self._missing(session, names)
+        if missing:
+            created = session.execute(self._insert(session, missing)).all()
+            self._stage(session, created)
+            existing = missing - {name for _, name in created}
+            if existing:
+                self._remember(session.execute(
+                    select(Topic.id, Topic.name).where(Topic.name.in_(existing))
+                ).all())
+        return self._resolve(session, names)
+
+
+topic_registry = TopicRegistry()
+
+
+class TopicMixin:
+    """
+    Adds a topic_id column and a `topic` name attribute resolved through the registry
+    Assigning a name that has no id yet is interned when the session flushes.
+    """
+
+    @declared_attr
+    def topic_id(cls):
+        return Column(Integer, ForeignKey("topics.id"), nullable=False)
+
+    @property
+    def topic(self) -> Optional[str]:
+        pending = self.__dict__.get("_pending_topic")
+        if pending is not None:
+            return pending
+        return topic_registry.name(self.topic_id)
+
+    @topic.setter
+    def topic(self, name: str):
+        name = name.strip()
+        self.topic_id = topic_registry.id(name)
+        if self.topic_id is None:
+            self._pending_topic = name
+        else:
+            self.__dict__.pop("_pending_topic", None)
+
+
+@event.listens_for(Session, "before_flush")
+def _intern_pending_topics(session, flush_context, instances):
+    """Give new topic names an id before rows referencing them are written"""
+    pending = [
+        obj for obj in (*session.new, *session.dirty)
+        if obj.__dict__.get("_pending_topic") is not None
+    ]
+    if not pending:
+        return
+
+    ids = topic_registry.intern_sync(session, {obj.__dict__["_pending_topic"] for obj in pending})
+    for obj in pending:
+        obj.topic_id = ids[obj.__dict__.pop("_pending_topic")]
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_staged_topics(session):
+    """Topics created in the transaction exist for every worker once it commits"""
+    staged = session.info.pop("staged_topics", None)
+    if staged:
+        topic_registry._remember((topic_id, name) for name, topic_id in staged.items())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_topics(session):
+    session.info.pop("staged_topics", None)
@@ -1,15 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, Text, UniqueConstraint, Index
 from datetime import datetime
 from .base import Base
+from .topic import TopicMixin
 
 
-class WeakTopicReport(Base):
+class WeakTopicReport(TopicMixin, Base):
     __tablename__ = "weak_topic_reports"
+    __table_args__ = (
+        Index("ix_weak_topic_reports_test_topic", "test_id", "topic_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
-    topic = Column(String(100), nullable=False)
     score = Column(Float, nullable=False)  # Percentage
     total_questions = Column(Integer, nullable=False)
     correct_answers = Column(Integer, nullable=False)
@@ -20,3 +23,80 @@ class WeakTopicReport(Base):
 
     def __repr__(self):
         return f"<WeakTopicReport(id={self.id}, topic={self.topic}, score={self.score})>"
+
+
+class TopicScore(TopicMixin, Base):
+    """Running per-topic tally for a student's test, updated as answers are graded"""
+    __tablename__ = "topic_scores"
+    __table_args__ = (
+        UniqueConstraint("student_id", "test_id", "topic_id", name="uq_topic_scores_student_test_topic"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
+    total_questions = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<TopicScore(student_id={self.student_id}, test_id={self.test_id}, topic={self.topic})>"
+
+
+class TopicRollup(TopicMixin, Base):
+    """Per-test, per-topic aggregate over all students, refreshed when marked stale"""
+    __tablename__ = "topic_rollups"
+    __table_args__ = (
+        UniqueConstraint("test_id", "topic_id", name="uq_topic_rollups_test_topic"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False, index=True)
+    student_count = Column(Integer, default=0, nullable=False)
+    weak_count = Column(Integer, default=0, nullable=False)
+    mean_score = Column(Float, default=0.0, nullable=False)
+    median_score = Column(Float, default=0.0, nullable=False)
+    score_buckets = Column(Text, nullable=True)  # JSON list of student counts per 20-point score band
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<TopicRollup(test_id={self.test_id}, topic={self.topic}, students={self.student_count})>"
+
+
+class TopicRollupChange(TopicMixin, Base):
+    """
+    (test, topic) pairs whose tallies changed since their rollup was refreshed
+    Writers insert and skip pairs already logged, so no rollup row is
+    locked and the log stays at one row per pair; a refresh deletes the
+    pairs it recomputes.
+    """
+    __tablename__ = "topic_rollup_changes"
+    __table_args__ = (
+        UniqueConstraint("test_id", "topic_id", name="uq_topic_rollup_changes_test_topic"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<TopicRollupChange(test_id={self.test_id}, topic={self.topic})>"
+
+
+class TopicMastery(TopicMixin, Base):
+    """One point of a student's mastery series for a topic, one per test taken"""
+    __tablename__ = "topic_mastery"
+    __table_args__ = (
+        UniqueConstraint("student_id", "topic_id", "test_id", name="uq_topic_mastery_student_topic_test"),
+        Index("ix_topic_mastery_student_topic_recorded", "student_id", "topic_id", "recorded_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
+    score = Column(Float, nullable=False)  # Topic score on this test (percentage)
+    mastery = Column(Float, nullable=False)  # Exponentially weighted average up to and including this test
+    recorded_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # First analysis of this test
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<TopicMastery(student_id={self.student_id}, topic={self.topic}, mastery={self.mastery})>"
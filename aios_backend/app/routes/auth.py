@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.deps import get_current_user, require_admin, require_faculty, require_student
-from app.models.user import User, UserRole
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.deps import CurrentUser, get_current_user, require_admin, require_faculty, require_student
+from app.core.security import HashPoolSaturated
+from app.models.user import UserRole
 from app.schemas import UserCreate, UserLogin, UserResponse, Token
 from app.services.auth_service import create_user, login_user, get_user_by_email, get_user_by_id
 
@@ -12,7 +14,7 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Register a new user
@@ -20,7 +22,7 @@ async def register(
     Role options: student, faculty, admin
     """
     # Check if user already exists
-    existing_user = get_user_by_email(db, user_data.email)
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,20 +30,34 @@ async def register(
         )
     
     # Create user
-    user = create_user(db, user_data)
+    try:
+        user = await create_user(db, user_data)
+    except HashPoolSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     return user
 
 
 @router.post("/login", response_model=Token)
 async def login(
     credentials: UserLogin,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Login with email and password
     Returns JWT token
     """
-    result = login_user(db, credentials.email, credentials.password)
+    try:
+        result = await login_user(db, credentials.email, credentials.password)
+    except HashPoolSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     
     if not result:
         raise HTTPException(
@@ -58,20 +74,27 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Get current authenticated user information"""
-    return current_user
+    user = await get_user_by_id(db, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    return user
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Get user information by ID (accessible to all authenticated users)"""
-    user = get_user_by_id(db, user_id)
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -82,10 +105,10 @@ async def get_user(
 
 @router.get("/admin/users", response_model=list[UserResponse])
 async def list_all_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_admin),
 ):
     """List all users (admin only)"""
     from app.models.user import User as UserModel
-    users = db.query(UserModel).all()
+    users = (await db.scalars(select(UserModel))).all()
     return users
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
-from app.core.database import get_db
-from app.core.deps import get_current_user, require_admin, require_student
-from app.models.user import User
+from app.core.database import get_async_db
+from app.core.deps import CurrentUser, get_current_user, require_admin, require_student
 from app.models.certificate import Certificate
 from app.schemas import CertificateCreate, CertificateResponse
 from app.services.certificate_service import (
@@ -18,15 +18,15 @@ router = APIRouter(prefix="/api/certificates", tags=["Certificates"])
 @router.post("/upload", response_model=CertificateResponse)
 async def upload_certificate_endpoint(
     cert_data: CertificateCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """
     Upload certificate metadata
     Validates certificate fields before storing
     """
     try:
-        certificate = upload_certificate(
+        certificate = await upload_certificate(
             db,
             student_id=current_user.id,
             course_name=cert_data.course_name,
@@ -46,32 +46,32 @@ async def upload_certificate_endpoint(
 
 @router.get("/my-certificates", response_model=List[CertificateResponse])
 async def get_my_certificates(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """Get all certificates uploaded by the current student"""
-    certificates = get_student_certificates(db, current_user.id)
+    certificates = await get_student_certificates(db, current_user.id)
     return certificates
 
 
 @router.get("/my-verified", response_model=List[CertificateResponse])
 async def get_my_verified_certificates(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """Get only verified certificates for the current student"""
-    certificates = get_verified_certificates(db, current_user.id)
+    certificates = await get_verified_certificates(db, current_user.id)
     return certificates
 
 
 @router.get("/{certificate_id}", response_model=CertificateResponse)
 async def get_certificate_details(
     certificate_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """Get details of a specific certificate"""
-    certificate = get_certificate_by_id(db, certificate_id)
+    certificate = await get_certificate_by_id(db, certificate_id)
     
     if not certificate:
         raise HTTPException(
@@ -94,15 +94,15 @@ async def verify_certificate_endpoint(
     certificate_id: int,
     status_update: str,
     notes: str = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_admin),
 ):
     """
     Verify or reject a certificate (admin only)
     Status options: verified, rejected
     """
     try:
-        certificate = verify_certificate(db, certificate_id, status_update, notes)
+        certificate = await verify_certificate(db, certificate_id, status_update, notes)
         return certificate
     except ValueError as e:
         raise HTTPException(
@@ -113,11 +113,13 @@ async def verify_certificate_endpoint(
 
 @router.get("/admin/pending", response_model=List[CertificateResponse])
 async def get_pending_certificates(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_admin),
 ):
     """Get all pending certificate verifications (admin only)"""
-    certificates = db.query(Certificate).filter(
-        Certificate.verification_status == "pending"
-    ).all()
+    certificates = (await db.scalars(
+        select(Certificate).where(
+            Certificate.verification_status == "pending"
+        )
+    )).all()
     return certificates
@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import json
-from app.core.database import get_db
-from app.core.deps import get_current_user, require_student
-from app.models.user import User
+from app.core.database import get_async_db
+from app.core.deps import CurrentUser, get_current_user, require_student, require_role
+from app.core.jobs import jobs
+from app.models.user import UserRole
 from app.models.gdpi import GDPIQuestion, GDPIResponse
-from app.schemas import GDPIQuestionResponse, GDPIResponseSubmit, GDPIResponseResponse
+from app.core.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas import (
+    GDPIQuestionResponse, GDPIResponseSubmit, GDPIResponseResponse, GDPISubmissionResponse, GDPIStudentResponses,
+    GDPIKeywordsUpdate, JobResponse
+)
+from app.services.gdpi_rescore_service import start_gdpi_rescore
 from app.services.gdpi_service import (
     get_gdpi_questions, get_gdpi_questions_by_category,
-    submit_gdpi_response, get_student_gdpi_responses
+    submit_gdpi_batch, get_student_gdpi_stats, get_student_gdpi_history
 )
 
 router = APIRouter(prefix="/api/gdpi", tags=["GDPI"])
@@ -18,52 +25,112 @@ router = APIRouter(prefix="/api/gdpi", tags=["GDPI"])
 @router.get("/questions", response_model=List[GDPIQuestionResponse])
 async def fetch_gdpi_questions(
     category: str = None,
+    difficulty: str = None,
     limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
-    Fetch curated GDPI interview questions
-    Optional filter by category: technical, hr, behavioral
+    Fetch a random selection of curated GDPI interview questions
+    Optional filters: category (technical, hr, behavioral) and difficulty
     """
     if category:
-        questions = get_gdpi_questions_by_category(db, category, limit)
+        questions = await get_gdpi_questions_by_category(db, category, limit, difficulty)
     else:
-        questions = get_gdpi_questions(db, limit)
+        questions = await get_gdpi_questions(db, limit, difficulty)
     
     return questions
 
 
-@router.post("/submit", response_model=dict)
+@router.put(
+    "/questions/{question_id}/keywords",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def update_gdpi_keywords(
+    question_id: int,
+    keywords_update: GDPIKeywordsUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role(UserRole.FACULTY, UserRole.ADMIN)),
+):
+    """
+    Change a GDPI question's scoring keywords and rescore its stored responses
+    Faculty and admins only. Returns a rescore job to poll for progress.
+    """
+    question = await db.get(GDPIQuestion, question_id)
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found",
+        )
+    
+    question.keywords = json.dumps(keywords_update.keywords)
+    await db.commit()
+    
+    return start_gdpi_rescore(question_id)
+
+
+@router.post(
+    "/questions/{question_id}/rescore",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def rescore_gdpi_question_endpoint(
+    question_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role(UserRole.FACULTY, UserRole.ADMIN)),
+):
+    """
+    Rescore a GDPI question's stored responses against its current keywords
+    Faculty and admins only. An interrupted rescore resumes from its last batch.
+    """
+    if not await db.get(GDPIQuestion, question_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found",
+        )
+    return start_gdpi_rescore(question_id)
+
+
+@router.get("/rescore-jobs/{job_id}", response_model=JobResponse)
+async def get_gdpi_rescore_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_role(UserRole.FACULTY, UserRole.ADMIN)),
+):
+    """Get progress of a GDPI rescore job (faculty and admins only)"""
+    job = jobs.get(job_id)
+    if not job or job.kind != "gdpi-rescore":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return job
+
+
+@router.post("/submit", response_model=GDPISubmissionResponse)
 async def submit_gdpi_responses(
     submission: GDPIResponseSubmit,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """
     Submit GDPI responses
-    Each response is evaluated with rule-based logic (keyword matching)
+    Each response is evaluated with rule-based logic (keyword matching).
+    The whole batch is stored together or, if a question is missing, not at all.
     """
-    responses = []
-    total_score = 0
-    
-    for response_data in submission.responses:
-        try:
-            gdpi_response = submit_gdpi_response(
-                db,
-                student_id=current_user.id,
-                question_id=response_data.question_id,
-                response_text=response_data.response_text,
-            )
-            responses.append(gdpi_response)
-            total_score += gdpi_response.score
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=str(e),
-            )
+    try:
+        responses = await submit_gdpi_batch(
+            db,
+            current_user.id,
+            [(response_data.question_id, response_data.response_text) for response_data in submission.responses],
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
     
-    average_score = total_score / len(responses) if responses else 0
+    average_score = sum(response.score for response in responses) / len(responses) if responses else 0
     
     return {
         "message": "Responses submitted and evaluated successfully",
@@ -73,27 +140,42 @@ async def submit_gdpi_responses(
     }
 
 
-@router.get("/student-responses", response_model=dict)
+@router.get("/student-responses", response_model=GDPIStudentResponses)
 async def get_student_responses(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    before: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    include_text: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
-    """Get all GDPI responses for the current student"""
-    result = get_student_gdpi_responses(db, current_user.id)
-    return result
+    """
+    Get the current student's GDPI score statistics and a page of responses
+    Responses are newest first; pass next_cursor as `before` for older ones.
+    Set include_text=false to leave out the response bodies.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stats = await get_student_gdpi_stats(db, current_user.id)
+    history = await get_student_gdpi_history(db, current_user.id, before, limit, include_text)
+    return {
+        **stats,
+        "responses": history["items"],
+        "next_cursor": history["next_cursor"],
+    }
 
 
 @router.get("/responses/{response_id}", response_model=GDPIResponseResponse)
 async def get_response_details(
     response_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """Get details of a specific GDPI response"""
-    response = db.query(GDPIResponse).filter(
-        GDPIResponse.id == response_id,
-        GDPIResponse.student_id == current_user.id,
-    ).first()
+    response = await db.scalar(
+        select(GDPIResponse).where(
+            GDPIResponse.id == response_id,
+            GDPIResponse.student_id == current_user.id,
+        )
+    )
     
     if not response:
         raise HTTPException(
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import json
-from app.core.database import get_db
-from app.core.deps import get_current_user, require_student
-from app.models.user import User
+from app.core.database import get_async_db
+from app.core.deps import CurrentUser, get_current_user, require_student
 from app.models.placement import PlacementProfile
 from app.schemas import PlacementProfileCreate, PlacementProfileUpdate, PlacementProfileResponse
 from app.services.placement_service import (
@@ -19,15 +18,15 @@ router = APIRouter(prefix="/api/placement", tags=["Placement"])
 @router.post("/profile", response_model=PlacementProfileResponse)
 async def create_placement_profile(
     profile_data: PlacementProfileCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """
     Create or update student placement profile
     Uses rule-based logic to determine best-fit domain
     """
     try:
-        profile = create_or_update_placement_profile(
+        profile = await create_or_update_placement_profile(
             db,
             student_id=current_user.id,
             skills=profile_data.skills,
@@ -51,11 +50,11 @@ async def create_placement_profile(
 
 @router.get("/profile", response_model=PlacementProfileResponse)
 async def get_my_profile(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """Get current student's placement profile"""
-    profile = get_placement_profile(db, current_user.id)
+    profile = await get_placement_profile(db, current_user.id)
     
     if not profile:
         raise HTTPException(
@@ -74,8 +73,8 @@ async def get_my_profile(
 @router.post("/analyze")
 async def analyze_skills(
     profile_data: PlacementProfileCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """
     Analyze skills and get best-fit domain recommendation
@@ -101,11 +100,11 @@ async def analyze_skills(
 @router.get("/domain/{domain}", response_model=List[PlacementProfileResponse])
 async def get_students_by_best_fit_domain(
     domain: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Get all students for a specific domain"""
-    profiles = get_students_by_domain(db, domain)
+    profiles = await get_students_by_domain(db, domain)
     
     # Parse JSON fields for response
     for profile in profiles:
@@ -120,11 +119,11 @@ async def get_students_by_best_fit_domain(
 async def get_top_students_in_domain(
     domain: str,
     limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Get top students by CGPA in a specific domain"""
-    profiles = get_top_students_by_domain(db, domain, limit)
+    profiles = await get_top_students_by_domain(db, domain, limit)
     
     # Parse JSON fields for response
     for profile in profiles:
@@ -1,16 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import json
-from app.core.database import get_db
-from app.core.deps import get_current_user, require_faculty, require_student
-from app.models.user import User
+from app.core.database import get_async_db
+from app.core.deps import CurrentUser, get_current_user, require_faculty, require_student
+from app.models.user import UserRole
 from app.models.test import Test, Question, Answer
+from app.models.topic import topic_registry
+from app.core.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, GRADING_MODE
 from app.schemas import (
-    TestCreate, TestResponse, QuestionCreate, StudentTestAnswerCreate,
-    AnswerCreate, TestAnalysisResponse, WeakTopicReportResponse
+    TestCreate, TestResponse, TestListResponse, AnswerKeyUpdate, JobResponse, QuestionCreate, StudentTestAnswerCreate,
+    AnswerCreate, TestAnalysisResponse, WeakTopicReportPage, TopicRollupResponse, QuestionItemAnalysis,
+    MasteryTrendResponse, AttemptResponse, DraftAnswersSave, DraftAnswersResponse, QuestionImportResponse,
+    LeaderboardPage, StandingResponse
+)
+from app.core.jobs import jobs
+from app.services.draft_service import draft_buffer
+from app.services.export_service import EXPORT_DATASETS, EXPORT_FORMATS, stream_test_export
+from app.services.grading_service import grading_queue
+from app.services.import_service import IMPORT_FORMATS, import_questions
+from app.services.item_analysis_service import get_item_analysis
+from app.services.leaderboard_service import get_leaderboard, get_student_standing
+from app.services.mastery_service import get_topic_mastery_trend
+from app.services.regrade_service import start_regrade
+from app.services.rollup_service import get_faculty_topic_rollups
+from app.services.test_cache import get_test_definition
+from app.services.weak_topic_service import (
+    get_test_analysis, get_faculty_weak_topics, record_graded_answers, start_new_attempt
 )
-from app.services.weak_topic_service import get_test_analysis, get_faculty_weak_topics
 
 router = APIRouter(prefix="/api/tests", tags=["Tests & Analysis"])
 
@@ -18,8 +38,8 @@ router = APIRouter(prefix="/api/tests", tags=["Tests & Analysis"])
 @router.post("/create", response_model=TestResponse)
 async def create_test(
     test_data: TestCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_faculty),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
 ):
     """
     Create a new test (faculty only)
@@ -30,98 +50,199 @@ async def create_test(
         description=test_data.description,
         created_by=current_user.id,
     )
-    db.add(test)
-    db.flush()  # To get test.id
     
-    # Create questions
+    # Create questions (attached to the new test so the collection is
+    # already loaded when the response is serialized)
     if test_data.questions:
         for q_data in test_data.questions:
             question = Question(
-                test_id=test.id,
                 question_text=q_data.question_text,
                 topic=q_data.topic,
                 correct_answer=q_data.correct_answer,
                 options=q_data.options,
                 difficulty=q_data.difficulty,
             )
-            db.add(question)
+            test.questions.append(question)
     
-    db.commit()
-    db.refresh(test)
+    db.add(test)
+    await db.commit()
     return test
 
 
+def check_import_format(format: str) -> str:
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {', '.join(IMPORT_FORMATS)}",
+        )
+    return format
+
+
+@router.post("/import", response_model=QuestionImportResponse)
+async def import_test(
+    request: Request,
+    title: str,
+    description: str = None,
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """
+    Create a test from an uploaded question file (faculty only)
+    The request body is NDJSON (one question object per line) or CSV with a
+    header row, using the question fields of /create. It is parsed as it
+    streams in; invalid rows are skipped and reported.
+    """
+    check_import_format(format)
+    test = Test(title=title, description=description, created_by=current_user.id)
+    db.add(test)
+    await db.flush()
+    return await import_questions(db, test.id, request.stream(), format)
+
+
+@router.post("/{test_id}/questions/import", response_model=QuestionImportResponse)
+async def import_test_questions(
+    test_id: int,
+    request: Request,
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """Add questions from an uploaded NDJSON or CSV file to a test (faculty only)"""
+    check_import_format(format)
+    await get_owned_test(db, test_id, current_user)
+    return await import_questions(db, test_id, request.stream(), format)
+
+
 @router.get("/{test_id}", response_model=TestResponse)
 async def get_test(
     test_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Get test details by ID"""
-    test = db.query(Test).filter(Test.id == test_id).first()
-    if not test:
+    definition = await get_test_definition(db, test_id)
+    if not definition:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test not found",
         )
-    return test
+    return Response(content=definition.response_body, media_type="application/json")
 
 
-@router.get("/", response_model=List[TestResponse])
+@router.get("/", response_model=TestListResponse)
 async def list_tests(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    after: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    include_questions: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    """List all available tests"""
-    tests = db.query(Test).all()
-    return tests
+    """
+    List available tests, ordered by ID
+    Pass the returned next_cursor as `after` to fetch the next page.
+    Questions, answer keys included, are omitted unless include_questions
+    is set, which is limited to faculty and admins.
+    """
+    if include_questions and current_user.role not in (UserRole.FACULTY, UserRole.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only faculty can list tests with their questions",
+        )
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    if include_questions:
+        # Questions for the whole page are loaded in one extra query
+        stmt = select(Test).options(selectinload(Test.questions))
+    else:
+        stmt = select(
+            Test.id, Test.title, Test.description,
+            Test.created_by, Test.created_at, Test.updated_at,
+        )
+    if after is not None:
+        stmt = stmt.where(Test.id > after)
+    stmt = stmt.order_by(Test.id).limit(limit + 1)
+    
+    result = await db.execute(stmt)
+    tests = result.scalars().all() if include_questions else result.all()
+    
+    has_more = len(tests) > limit
+    tests = tests[:limit]
+    if include_questions:
+        await topic_registry.ensure(db, {q.topic_id for test in tests for q in test.questions})
+    return {
+        "items": tests,
+        "next_cursor": tests[-1].id if has_more else None,
+    }
 
 
-@router.post("/submit-answers", response_model=TestAnalysisResponse)
+@router.post(
+    "/submit-answers",
+    response_model=TestAnalysisResponse,
+    responses={202: {"model": JobResponse, "description": "Answers stored, analysis queued"}},
+)
 async def submit_test_answers(
     submission: StudentTestAnswerCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    mode: str = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """
     Submit test answers and get analysis
-    Analyzes answers and identifies weak topics
+    Analyzes answers and identifies weak topics. With mode=async (or
+    GRADING_MODE=async) the answers are stored and 202 is returned with a
+    grading job to poll at /api/tests/grading-jobs/{job_id}.
     """
+    mode = (mode or GRADING_MODE).lower()
+    if mode not in ("sync", "async"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="mode must be sync or async",
+        )
+    
     # Verify test exists
-    test = db.query(Test).filter(Test.id == submission.test_id).first()
-    if not test:
+    definition = await get_test_definition(db, submission.test_id)
+    if not definition:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test not found",
         )
     
-    # Create answer records
+    # Verify all questions belong to test using the cached definition
+    questions = definition.questions
     for answer_data in submission.answers:
-        # Verify question exists and belongs to test
-        question = db.query(Question).filter(
-            Question.id == answer_data.question_id,
-            Question.test_id == submission.test_id,
-        ).first()
-        
-        if not question:
+        if answer_data.question_id not in questions:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Question {answer_data.question_id} not found in this test",
             )
-        
-        # Create answer record
-        answer = Answer(
-            question_id=answer_data.question_id,
-            student_id=current_user.id,
-            test_id=submission.test_id,
-            student_answer=answer_data.student_answer,
-        )
-        db.add(answer)
     
-    db.commit()
+    # Submitted answers replace their drafts
+    await draft_buffer.drain(
+        db,
+        current_user.id,
+        submission.test_id,
+        [answer_data.question_id for answer_data in submission.answers],
+    )
+    
+    # Grade and upsert answers into the current attempt
+    await record_graded_answers(
+        db,
+        current_user.id,
+        submission.test_id,
+        [(answer_data.question_id, answer_data.student_answer) for answer_data in submission.answers],
+        questions,
+    )
+    
+    if mode == "async":
+        job = grading_queue.enqueue(current_user.id, submission.test_id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=JobResponse.model_validate(job).model_dump(mode="json"),
+        )
     
     # Analyze test performance
-    analysis = get_test_analysis(db, current_user.id, submission.test_id)
+    analysis = await get_test_analysis(db, current_user.id, submission.test_id)
     
     return {
         "test_id": analysis["test_id"],
@@ -131,26 +252,112 @@ async def submit_test_answers(
         "weak_topics": analysis["weak_topics"],
         "score_breakdown": analysis["score_breakdown"],
         "recommendation_message": analysis["recommendation_message"],
+        "attempt": analysis["attempt"],
+    }
+
+
+@router.put("/{test_id}/drafts", status_code=status.HTTP_202_ACCEPTED)
+async def save_draft_answers(
+    test_id: int,
+    drafts: DraftAnswersSave,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
+):
+    """
+    Autosave answers while a test is being taken (students only)
+    Drafts are buffered and written in batches, so this can be called on
+    every edit. They are not graded until submitted.
+    """
+    definition = await get_test_definition(db, test_id)
+    if not definition:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found",
+        )
+    
+    for answer_data in drafts.answers:
+        if answer_data.question_id not in definition.questions:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Question {answer_data.question_id} not found in this test",
+            )
+    
+    saved = draft_buffer.save(
+        current_user.id,
+        test_id,
+        [(answer_data.question_id, answer_data.student_answer) for answer_data in drafts.answers],
+    )
+    return {"test_id": test_id, "saved": saved}
+
+
+@router.get("/{test_id}/drafts", response_model=DraftAnswersResponse)
+async def get_draft_answers(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
+):
+    """Get the student's autosaved answers for a test that are not yet submitted"""
+    return {
+        "test_id": test_id,
+        "answers": await draft_buffer.get(db, current_user.id, test_id),
     }
 
 
+@router.post("/{test_id}/attempts", response_model=AttemptResponse)
+async def start_attempt(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
+):
+    """
+    Start a new attempt at a test (students only)
+    Answers submitted afterwards are analyzed without those of earlier attempts
+    """
+    if not await get_test_definition(db, test_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found",
+        )
+    
+    attempt = await start_new_attempt(db, current_user.id, test_id)
+    return {"test_id": test_id, "attempt": attempt}
+
+
+@router.get("/grading-jobs/{job_id}", response_model=JobResponse)
+async def get_grading_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_student),
+):
+    """
+    Get the status of a queued analysis (students only)
+    The analysis is in `result` once completed. Jobs are tracked per worker
+    process; GET /analysis/{test_id} returns the same analysis regardless.
+    """
+    job = jobs.get(job_id)
+    if not job or job.kind != "grading" or job.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return job
+
+
 @router.get("/analysis/{test_id}", response_model=TestAnalysisResponse)
 async def get_test_analysis_endpoint(
     test_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
 ):
     """Get analysis for a specific test (student's own results)"""
     # Verify test exists
-    test = db.query(Test).filter(Test.id == test_id).first()
-    if not test:
+    if not await get_test_definition(db, test_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test not found",
         )
     
     # Get analysis
-    analysis = get_test_analysis(db, current_user.id, test_id)
+    analysis = await get_test_analysis(db, current_user.id, test_id)
     
     return {
         "test_id": analysis["test_id"],
@@ -160,17 +367,231 @@ async def get_test_analysis_endpoint(
         "weak_topics": analysis["weak_topics"],
         "score_breakdown": analysis["score_breakdown"],
         "recommendation_message": analysis["recommendation_message"],
+        "attempt": analysis["attempt"],
+    }
+
+
+@router.get("/{test_id}/standing", response_model=StandingResponse)
+async def get_standing(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_student),
+):
+    """Get the student's rank and percentile among everyone who took the test"""
+    standing = await get_student_standing(db, test_id, current_user.id)
+    if standing is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No analyzed result for this test yet",
+        )
+    return standing
+
+
+@router.get("/{test_id}/leaderboard", response_model=LeaderboardPage)
+async def get_test_leaderboard(
+    test_id: int,
+    offset: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """
+    Get a test's ranking, best score first (faculty only)
+    Pass the returned next_offset as `offset` to fetch the next page.
+    """
+    await get_owned_test(db, test_id, current_user)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(offset, 0)
+    
+    leaderboard = await get_leaderboard(db, test_id)
+    end = offset + limit
+    return {
+        "test_id": test_id,
+        "participants": len(leaderboard.entries),
+        "items": leaderboard.entries[offset:end],
+        "next_offset": end if end < len(leaderboard.entries) else None,
+    }
+
+
+@router.get("/mastery/trend", response_model=MasteryTrendResponse)
+async def mastery_trend(
+    topic: str,
+    student_id: int = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Get a student's rolling mastery of a topic across the tests they took
+    Students see their own trend; faculty and admins may pass student_id
+    """
+    if student_id is None or student_id == current_user.id:
+        student_id = current_user.id
+    elif current_user.role not in (UserRole.FACULTY, UserRole.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view your own mastery trend",
+        )
+    
+    points = await get_topic_mastery_trend(db, student_id, topic)
+    return {
+        "student_id": student_id,
+        "topic": topic,
+        "current_mastery": points[-1]["mastery"] if points else None,
+        "points": points,
     }
 
 
-@router.get("/faculty/weak-topics", response_model=List[WeakTopicReportResponse])
+@router.get("/faculty/weak-topics/summary", response_model=List[TopicRollupResponse])
+async def faculty_weak_topic_summary(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """
+    Get per-test, per-topic aggregates across the faculty's tests
+    Faculty only endpoint
+    """
+    return await get_faculty_topic_rollups(db, current_user.id)
+
+
+@router.get("/faculty/weak-topics", response_model=WeakTopicReportPage)
 async def faculty_weak_topics(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_faculty),
+    test_id: int = None,
+    topic: str = None,
+    after: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
 ):
     """
-    Get weak topics for all students who took the faculty's tests
+    Get weak topic reports for students who took the faculty's tests
+    Optionally filtered by test and topic; pass the returned next_cursor
+    as `after` to fetch the next page.
     Faculty only endpoint
     """
-    weak_topics = get_faculty_weak_topics(db, current_user.id)
-    return weak_topics
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return await get_faculty_weak_topics(
+        db, current_user.id, test_id=test_id, topic=topic, after=after, limit=limit
+    )
+
+
+async def get_owned_test(db: AsyncSession, test_id: int, faculty: CurrentUser) -> Test:
+    """Get a test created by the given faculty member, or raise 404/403"""
+    test = await db.get(Test, test_id)
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found",
+        )
+    if test.created_by != faculty.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only manage your own tests",
+        )
+    return test
+
+
+@router.put(
+    "/{test_id}/questions/{question_id}/answer-key",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def update_answer_key(
+    test_id: int,
+    question_id: int,
+    key_update: AnswerKeyUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """
+    Correct a question's answer key and regrade every student (faculty only)
+    Returns a regrade job to poll for progress
+    """
+    await get_owned_test(db, test_id, current_user)
+    question = await db.scalar(
+        select(Question).where(
+            Question.id == question_id,
+            Question.test_id == test_id,
+        )
+    )
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Question {question_id} not found in this test",
+        )
+    
+    question.correct_answer = key_update.correct_answer
+    await db.commit()
+    
+    return start_regrade(test_id, current_user.id)
+
+
+@router.post("/{test_id}/regrade", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def regrade_test_endpoint(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """Regrade all answers for a test against its current answer key (faculty only)"""
+    await get_owned_test(db, test_id, current_user)
+    return start_regrade(test_id, current_user.id)
+
+
+@router.get("/{test_id}/item-analysis", response_model=List[QuestionItemAnalysis])
+async def item_analysis(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """
+    Get difficulty, discrimination and distractor frequencies per question (faculty only)
+    Served from running per-question sums kept up to date as answers are graded
+    """
+    await get_owned_test(db, test_id, current_user)
+    return await get_item_analysis(db, test_id)
+
+
+@router.get("/regrade-jobs/{job_id}", response_model=JobResponse)
+async def get_regrade_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """Get progress of a regrade job (only the faculty member who started it)"""
+    job = jobs.get(job_id)
+    if not job or job.kind != "regrade" or job.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return job
+
+
+@router.get("/{test_id}/export")
+async def export_test(
+    test_id: int,
+    dataset: str = "answers",
+    format: str = "csv",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_faculty),
+):
+    """
+    Stream a test's answers, results or weak topics as CSV or NDJSON (faculty only)
+    dataset: answers, results or weak-topics
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"dataset must be one of: {', '.join(EXPORT_DATASETS)}",
+        )
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    await get_owned_test(db, test_id, current_user)
+    
+    filename = f"test-{test_id}-{dataset}.{format}"
+    return StreamingResponse(
+        stream_test_export(test_id, dataset, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -54,6 +54,18 @@ class QuestionCreate(QuestionBase):
     pass
 
 
+class ImportRowErrorResponse(BaseModel):
+    row: int
+    error: str
+
+
+class QuestionImportResponse(BaseModel):
+    test_id: int
+    imported: int
+    failed: int
+    errors: List[ImportRowErrorResponse]  # First IMPORT_MAX_ERRORS failures
+
+
 class QuestionResponse(QuestionBase):
     id: int
     test_id: int
@@ -83,6 +95,42 @@ class TestResponse(TestBase):
         from_attributes = True
 
 
+class TestListItem(TestBase):
+    id: int
+    created_by: int
+    questions: Optional[List[QuestionResponse]] = None  # Only set when questions are requested
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TestListResponse(BaseModel):
+    items: List[TestListItem]
+    next_cursor: Optional[int] = None  # Pass as `after` to fetch the next page
+
+
+class AnswerKeyUpdate(BaseModel):
+    correct_answer: str
+
+
+# Background Job Schemas
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: float
+    message: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Answer Schemas
 class AnswerCreate(BaseModel):
     question_id: int
@@ -94,6 +142,21 @@ class StudentTestAnswerCreate(BaseModel):
     answers: List[AnswerCreate]
 
 
+class DraftAnswersSave(BaseModel):
+    answers: List[AnswerCreate]
+
+
+class DraftAnswerResponse(BaseModel):
+    question_id: int
+    student_answer: str
+    updated_at: datetime
+
+
+class DraftAnswersResponse(BaseModel):
+    test_id: int
+    answers: List[DraftAnswerResponse]
+
+
 class AnswerResponse(BaseModel):
     id: int
     question_id: int
@@ -124,6 +187,56 @@ class WeakTopicReportResponse(BaseModel):
         from_attributes = True
 
 
+class WeakTopicReportPage(BaseModel):
+    items: List[WeakTopicReportResponse]
+    next_cursor: Optional[int] = None  # Pass as `after` to fetch the next page
+
+
+class TopicRollupResponse(BaseModel):
+    test_id: int
+    test_title: str
+    topic: str
+    student_count: int
+    weak_count: int
+    mean_score: float
+    median_score: float
+    score_buckets: List[int]  # Students per 20-point score band, lowest first
+    updated_at: Optional[datetime] = None
+
+
+class OptionFrequency(BaseModel):
+    option: str
+    count: int
+    share: float  # Fraction of all responses to the question
+    is_correct: bool
+
+
+class QuestionItemAnalysis(BaseModel):
+    question_id: int
+    topic: str
+    responses: int
+    p_value: Optional[float] = None  # Fraction answering correctly (difficulty index)
+    discrimination: Optional[float] = None  # Point-biserial correlation with test score
+    distractors: List[OptionFrequency] = []
+    other_responses: int = 0  # Answers matching none of the options
+    flags: List[str] = []
+
+
+class MasteryPoint(BaseModel):
+    test_id: int
+    test_title: str
+    score: float  # Topic score on this test
+    mastery: float  # Rolling mastery after this test
+    recorded_at: datetime
+
+
+class MasteryTrendResponse(BaseModel):
+    student_id: int
+    topic: str
+    current_mastery: Optional[float] = None
+    points: List[MasteryPoint]
+
+
 class TestAnalysisResponse(BaseModel):
     test_id: int
     overall_score: float
@@ -132,6 +245,35 @@ class TestAnalysisResponse(BaseModel):
     weak_topics: List[WeakTopicReportResponse]
     score_breakdown: dict  # {topic: score}
     recommendation_message: str
+    attempt: int = 1
+
+
+class LeaderboardEntry(BaseModel):
+    student_id: int
+    student_name: str
+    score: float
+    rank: int
+    percentile: float  # Share of students who scored lower
+
+
+class LeaderboardPage(BaseModel):
+    test_id: int
+    participants: int
+    items: List[LeaderboardEntry]
+    next_offset: Optional[int] = None
+
+
+class StandingResponse(BaseModel):
+    test_id: int
+    score: float
+    rank: int
+    percentile: float
+    participants: int
+
+
+class AttemptResponse(BaseModel):
+    test_id: int
+    attempt: int
 
 
 # GDPI Schemas
@@ -145,6 +287,10 @@ class GDPIQuestionResponse(BaseModel):
         from_attributes = True
 
 
+class GDPIKeywordsUpdate(BaseModel):
+    keywords: List[str]
+
+
 class GDPIResponseCreate(BaseModel):
     question_id: int
     response_text: str
@@ -167,6 +313,41 @@ class GDPIResponseResponse(BaseModel):
         from_attributes = True
 
 
+class GDPIHistoryItem(BaseModel):
+    id: int
+    student_id: int
+    question_id: int
+    response_text: Optional[str] = None  # Left out unless include_text is set
+    score: float
+    feedback: Optional[str] = None
+    created_at: datetime
+
+
+class GDPICategoryStats(BaseModel):
+    category: str
+    responses: int
+    average_score: float
+    best_score: float
+    worst_score: float
+
+
+class GDPIStudentResponses(BaseModel):
+    total_responses: int
+    average_score: float
+    best_score: Optional[float] = None
+    worst_score: Optional[float] = None
+    by_category: List[GDPICategoryStats]
+    responses: List[GDPIHistoryItem]  # One page, newest first
+    next_cursor: Optional[int] = None  # Pass as `before` to fetch the next page
+
+
+class GDPISubmissionResponse(BaseModel):
+    message: str
+    total_responses: int
+    average_score: float
+    responses: List[GDPIResponseResponse]
+
+
 # Placement Profile Schemas
 class PlacementProfileCreate(BaseModel):
     skills: List[str]
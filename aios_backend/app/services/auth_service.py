@@ -1,49 +1,50 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_password_async, create_access_token
 from app.schemas import UserCreate
 
 
-def create_user(db: Session, user: UserCreate) -> User:
+async def create_user(db: AsyncSession, user: UserCreate) -> User:
     """Create a new user"""
     db_user = User(
         name=user.name,
         email=user.email,
-        password_hash=hash_password(user.password),
+        password_hash=await hash_password_async(user.password),
         role=user.role,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
-def get_user_by_email(db: Session, email: str) -> User:
+async def get_user_by_email(db: AsyncSession, email: str) -> User:
     """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email))
 
 
-def get_user_by_id(db: Session, user_id: int) -> User:
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
     """Get user by ID"""
-    return db.query(User).filter(User.id == user_id).first()
+    return await db.scalar(select(User).where(User.id == user_id))
 
 
-def authenticate_user(db: Session, email: str, password: str) -> User:
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
     """Authenticate user and return user object if credentials are valid"""
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
     return user
 
 
-def login_user(db: Session, email: str, password: str) -> dict:
+async def login_user(db: AsyncSession, email: str, password: str) -> dict:
     """Login user and return token"""
-    user = authenticate_user(db, email, password)
+    user = await authenticate_user(db, email, password)
     if not user:
         return None
-    
+
     token = create_access_token(data={"sub": user.id})
     return {
         "access_token": token,
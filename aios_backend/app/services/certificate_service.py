@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
 from app.models.certificate import Certificate
@@ -45,8 +46,8 @@ def validate_certificate_data(
     return is_valid, error_message
 
 
-def upload_certificate(
-    db: Session,
+async def upload_certificate(
+    db: AsyncSession,
     student_id: int,
     course_name: str,
     organization: str,
@@ -84,32 +85,32 @@ def upload_certificate(
     )
     
     db.add(certificate)
-    db.commit()
-    db.refresh(certificate)
+    await db.commit()
+    await db.refresh(certificate)
     
     return certificate
 
 
-def get_student_certificates(db: Session, student_id: int) -> List[Certificate]:
+async def get_student_certificates(db: AsyncSession, student_id: int) -> List[Certificate]:
     """Get all certificates for a student"""
-    return db.query(Certificate).filter(
-        Certificate.student_id == student_id
-    ).order_by(Certificate.created_at.desc()).all()
+    return (await db.scalars(
+        select(Certificate).where(
+            Certificate.student_id == student_id
+        ).order_by(Certificate.created_at.desc())
+    )).all()
 
 
-def get_certificate_by_id(db: Session, certificate_id: int) -> Certificate:
+async def get_certificate_by_id(db: AsyncSession, certificate_id: int) -> Certificate:
     """Get certificate by ID"""
-    return db.query(Certificate).filter(
-        Certificate.id == certificate_id
-    ).first()
+    return await db.get(Certificate, certificate_id)
 
 
-def verify_certificate(db: Session, certificate_id: int, status: str, notes: str = None) -> Certificate:
+async def verify_certificate(db: AsyncSession, certificate_id: int, status: str, notes: str = None) -> Certificate:
     """Verify/reject a certificate (admin endpoint)"""
     if status not in ["verified", "rejected"]:
         raise ValueError("Status must be 'verified' or 'rejected'")
     
-    certificate = get_certificate_by_id(db, certificate_id)
+    certificate = await get_certificate_by_id(db, certificate_id)
     if not certificate:
         raise ValueError(f"Certificate {certificate_id} not found")
     
@@ -118,15 +119,17 @@ def verify_certificate(db: Session, certificate_id: int, status: str, notes: str
         certificate.notes = notes
     
     db.add(certificate)
-    db.commit()
-    db.refresh(certificate)
+    await db.commit()
+    await db.refresh(certificate)
     
     return certificate
 
 
-def get_verified_certificates(db: Session, student_id: int) -> List[Certificate]:
+async def get_verified_certificates(db: AsyncSession, student_id: int) -> List[Certificate]:
     """Get verified certificates for a student"""
-    return db.query(Certificate).filter(
-        Certificate.student_id == student_id,
-        Certificate.verification_status == "verified"
-    ).all()
+    return (await db.scalars(
+        select(Certificate).where(
+            Certificate.student_id == student_id,
+            Certificate.verification_status == "verified"
+        )
+    )).all()
@@ -0,0 +1,189 @@
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import logging
+from app.core.config import DRAFT_FLUSH_INTERVAL, DRAFT_FLUSH_SIZE
+from app.core.database import AsyncSessionLocal, chunks, upsert_insert
+from app.models.test import DraftAnswer
+
+logger = logging.getLogger(__name__)
+
+DRAFT_BATCH_SIZE = 1000
+
+
+async def _upsert_drafts(db: AsyncSession, rows: List[Dict]) -> None:
+    stmt = upsert_insert(db, DraftAnswer)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "question_id"],
+        set_={
+            "test_id": stmt.excluded.test_id,
+            "student_answer": stmt.excluded.student_answer,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    for chunk in chunks(rows, DRAFT_BATCH_SIZE):
+        await db.execute(stmt, chunk)
+
+
+class DraftBuffer:
+    """
+    In-memory buffer of autosaved answers, written to draft_answers in batches
+    Only the latest text per (student, question) is kept, so a flush writes
+    one row per edited question however often it changed since the last one.
+    Flushes run every flush_interval seconds, or sooner once flush_size
+    answers are waiting.
+    """
+
+    def __init__(self, flush_interval: float, flush_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        # (student_id, question_id) -> (test_id, student_answer, saved_at)
+        self._pending: Dict[Tuple[int, int], Tuple[int, str, datetime]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop = None
+        self._task = None
+        self.saves = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing draft answers failed")
+
+    def save(self, student_id: int, test_id: int, answers: Iterable[Tuple[int, str]]) -> int:
+        """Buffer a student's draft answers and return how many were accepted"""
+        self._ensure_flusher()
+        now = datetime.utcnow()
+        count = 0
+        for question_id, student_answer in answers:
+            self._pending[(student_id, question_id)] = (test_id, student_answer, now)
+            count += 1
+        self.saves += count
+        if len(self._pending) >= self.flush_size:
+            self._wake.set()
+        return count
+
+    async def flush(self) -> int:
+        """Write all buffered drafts and return how many rows were written"""
+        if self._lock is None:
+            return 0
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            rows = [
+                {
+                    "student_id": student_id,
+                    "question_id": question_id,
+                    "test_id": test_id,
+                    "student_answer": student_answer,
+                    "updated_at": saved_at,
+                }
+                for (student_id, question_id), (test_id, student_answer, saved_at) in pending.items()
+            ]
+            try:
+                async with AsyncSessionLocal() as db:
+                    await _upsert_drafts(db, rows)
+                    await db.commit()
+            except Exception:
+                # Keep drafts for the next flush unless they were edited meanwhile
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+                raise
+            self.flushes += 1
+            self.rows_written += len(rows)
+            return len(rows)
+
+    async def drain(self, db: AsyncSession, student_id: int, test_id: int, submitted: Iterable[int]) -> None:
+        """
+        Settle a student's drafts for a test as answers are submitted
+        Drafts of the submitted questions are dropped; other buffered drafts
+        of the test are written with the caller's transaction.
+        """
+        submitted = set(submitted)
+        if self._lock is not None:
+            # Wait for an in-flight flush so it cannot write dropped drafts back
+            async with self._lock:
+                keys = [
+                    key for key, (draft_test_id, _, _) in self._pending.items()
+                    if key[0] == student_id and draft_test_id == test_id
+                ]
+                remaining = {key: self._pending.pop(key) for key in keys}
+        else:
+            remaining = {}
+
+        rows = [
+            {
+                "student_id": student_id,
+                "question_id": question_id,
+                "test_id": test_id,
+                "student_answer": student_answer,
+                "updated_at": saved_at,
+            }
+            for (_, question_id), (_, student_answer, saved_at) in remaining.items()
+            if question_id not in submitted
+        ]
+        if rows:
+            await _upsert_drafts(db, rows)
+        if submitted:
+            await db.execute(
+                delete(DraftAnswer).where(
+                    DraftAnswer.student_id == student_id,
+                    DraftAnswer.question_id.in_(submitted),
+                )
+            )
+
+    async def get(self, db: AsyncSession, student_id: int, test_id: int) -> List[Dict]:
+        """Get a student's current drafts for a test, buffered edits included"""
+        drafts = {
+            draft.question_id: {
+                "question_id": draft.question_id,
+                "student_answer": draft.student_answer,
+                "updated_at": draft.updated_at,
+            }
+            for draft in (await db.scalars(
+                select(DraftAnswer).where(
+                    DraftAnswer.student_id == student_id,
+                    DraftAnswer.test_id == test_id,
+                )
+            )).all()
+        }
+        for (draft_student_id, question_id), (draft_test_id, student_answer, saved_at) in list(self._pending.items()):
+            if draft_student_id == student_id and draft_test_id == test_id:
+                drafts[question_id] = {
+                    "question_id": question_id,
+                    "student_answer": student_answer,
+                    "updated_at": saved_at,
+                }
+        return [drafts[question_id] for question_id in sorted(drafts)]
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "saves": self.saves,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+
+draft_buffer = DraftBuffer(DRAFT_FLUSH_INTERVAL, DRAFT_FLUSH_SIZE)
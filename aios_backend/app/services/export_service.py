@@ -0,0 +1,128 @@
+from sqlalchemy import select
+from typing import AsyncIterator, Callable, Dict, List
+from datetime import datetime
+import csv
+import io
+import json
+from app.core.database import AsyncSessionLocal
+from app.models.test import Answer, Question, TestResult
+from app.models.topic import topic_registry
+from app.models.user import User
+from app.models.weak_topic import WeakTopicReport
+
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _answers_query(test_id: int):
+    return select(
+        Answer.id.label("answer_id"),
+        Answer.student_id,
+        User.email.label("student_email"),
+        Answer.attempt,
+        Answer.question_id,
+        Question.topic_id.label("topic"),
+        Answer.student_answer,
+        Answer.is_correct,
+        Answer.created_at,
+    ).join(User, User.id == Answer.student_id).join(
+        Question, Question.id == Answer.question_id
+    ).where(Answer.test_id == test_id).order_by(Answer.id)
+
+
+def _results_query(test_id: int):
+    return select(
+        TestResult.student_id,
+        User.email.label("student_email"),
+        TestResult.overall_score,
+        TestResult.total_questions,
+        TestResult.correct_answers,
+        TestResult.score_breakdown,
+        (TestResult.analyzed_version == TestResult.answers_version).label("up_to_date"),
+        TestResult.updated_at,
+    ).join(User, User.id == TestResult.student_id).where(
+        TestResult.test_id == test_id,
+        TestResult.analyzed_version >= 0,
+        TestResult.total_questions > 0,
+    ).order_by(TestResult.student_id)
+
+
+def _weak_topics_query(test_id: int):
+    return select(
+        WeakTopicReport.student_id,
+        User.email.label("student_email"),
+        WeakTopicReport.topic_id.label("topic"),
+        WeakTopicReport.score,
+        WeakTopicReport.total_questions,
+        WeakTopicReport.correct_answers,
+        WeakTopicReport.is_weak,
+        WeakTopicReport.recommendation,
+        WeakTopicReport.created_at,
+    ).join(User, User.id == WeakTopicReport.student_id).where(
+        WeakTopicReport.test_id == test_id
+    ).order_by(WeakTopicReport.id)
+
+
+EXPORT_DATASETS: Dict[str, Callable] = {
+    "answers": _answers_query,
+    "results": _results_query,
+    "weak-topics": _weak_topics_query,
+}
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(rows: List) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_json_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows: List, columns: List[str]) -> bytes:
+    lines = []
+    for row in rows:
+        record = {column: _json_value(value) for column, value in zip(columns, row)}
+        if "score_breakdown" in record and record["score_breakdown"]:
+            record["score_breakdown"] = json.loads(record["score_breakdown"])
+        lines.append(json.dumps(record))
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def stream_test_export(test_id: int, dataset: str, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Yield an export of one dataset of a test as CSV or NDJSON chunks
+    Rows come from a server-side cursor EXPORT_BATCH_SIZE at a time, so
+    memory stays flat regardless of export size. The generator owns its
+    session because it outlives the request handler.
+    """
+    stmt = EXPORT_DATASETS[dataset](test_id)
+    columns = [column.name for column in stmt.selected_columns]
+    # Topic ids are exported as names; every topic in a test's data comes from its questions
+    topic_index = columns.index("topic") if "topic" in columns else None
+
+    async with AsyncSessionLocal() as db:
+        if topic_index is not None:
+            await topic_registry.ensure(db, (await db.scalars(
+                select(Question.topic_id).where(Question.test_id == test_id).distinct()
+            )).all())
+
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            yield _encode_csv([columns])
+        async for rows in result.partitions():
+            if topic_index is not None:
+                rows = [
+                    (*row[:topic_index], topic_registry.name(row[topic_index]), *row[topic_index + 1:])
+                    for row in rows
+                ]
+            if fmt == "csv":
+                yield _encode_csv(rows)
+            else:
+                yield _encode_ndjson(rows, columns)
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import random
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import GDPI_BANK_TTL
+from app.models.gdpi import GDPIQuestion
+
+
+@dataclass(frozen=True)
+class BankQuestion:
+    """Immutable snapshot of a GDPI question"""
+    id: int
+    question_text: str
+    category: str
+    difficulty: str
+    keywords: str  # JSON list of keywords for scoring
+
+
+@dataclass(frozen=True)
+class QuestionBank:
+    """All GDPI questions, indexed by category and difficulty"""
+    by_filter: Dict[Tuple[Optional[str], Optional[str]], Tuple[BankQuestion, ...]]
+
+    def pool(self, category: Optional[str] = None, difficulty: Optional[str] = None) -> Tuple[BankQuestion, ...]:
+        return self.by_filter.get((category, difficulty), ())
+
+
+# The whole bank under a single key; dropped when a question changes
+bank_cache = TTLCache(maxsize=1, ttl=GDPI_BANK_TTL)
+BANK_KEY = "gdpi_questions"
+
+
+def build_question_bank(questions: List[GDPIQuestion]) -> QuestionBank:
+    """Index questions under every (category, difficulty) filter combination"""
+    by_filter: Dict[Tuple[Optional[str], Optional[str]], List[BankQuestion]] = {}
+    for question in questions:
+        entry = BankQuestion(
+            id=question.id,
+            question_text=question.question_text,
+            category=question.category,
+            difficulty=question.difficulty,
+            keywords=question.keywords,
+        )
+        for key in (
+            (None, None),
+            (entry.category, None),
+            (None, entry.difficulty),
+            (entry.category, entry.difficulty),
+        ):
+            by_filter.setdefault(key, []).append(entry)
+    return QuestionBank(by_filter={key: tuple(pool) for key, pool in by_filter.items()})
+
+
+async def get_question_bank(db: AsyncSession) -> QuestionBank:
+    """Get the question bank from the cache, loading it on a miss"""
+    bank = bank_cache.get(BANK_KEY)
+    if bank is None:
+        bank = build_question_bank(
+            (await db.scalars(select(GDPIQuestion).order_by(GDPIQuestion.id))).all()
+        )
+        bank_cache.set(BANK_KEY, bank)
+    return bank
+
+
+def sample_questions(
+    bank: QuestionBank,
+    limit: int,
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+) -> List[BankQuestion]:
+    """Uniform random sample without replacement from the matching questions"""
+    pool = bank.pool(category, difficulty)
+    return random.sample(pool, min(max(limit, 0), len(pool)))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_questions(session, flush_context):
+    """Remember whether GDPI questions changed in this transaction"""
+    if any(isinstance(obj, GDPIQuestion) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["gdpi_bank_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_question_bank(session):
+    if session.info.pop("gdpi_bank_changed", False):
+        bank_cache.pop(BANK_KEY)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_question_bank_change(session):
+    session.info.pop("gdpi_bank_changed", None)
@@ -0,0 +1,214 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import multiprocessing
+import time
+from sqlalchemy import select, update, delete, func
+from app.core.config import GDPI_RESCORE_WORKERS, GDPI_RESCORE_BATCH_SIZE
+from app.core.database import AsyncSessionLocal, upsert_insert
+from app.core.jobs import Job, jobs
+from app.models.gdpi import GDPIQuestion, GDPIResponse, GDPIRescoreCheckpoint
+from app.services.gdpi_service import evaluate_gdpi_response, generate_gdpi_feedback
+from app.services.keyword_matcher import KeywordMatcher
+
+_executor: Optional[ProcessPoolExecutor] = None
+# question_id -> running rescore job, so a question is never rescored twice at once
+_running: Dict[int, Job] = {}
+# Questions whose keywords changed while their job was running; the job runs again
+_rerun: Set[int] = set()
+
+
+def get_rescore_executor() -> ProcessPoolExecutor:
+    """Process pool for scoring, started on first use"""
+    global _executor
+    if _executor is None:
+        # Spawned workers don't inherit the server's threads or connections
+        _executor = ProcessPoolExecutor(
+            max_workers=GDPI_RESCORE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+@lru_cache(maxsize=64)
+def _worker_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(list(keywords))
+
+
+def _parse_keywords(keywords_json) -> Tuple[str, ...]:
+    return tuple(json.loads(keywords_json) if isinstance(keywords_json, str) else keywords_json)
+
+
+async def _reset_checkpoint(db, question_id: int, keywords_json: str) -> None:
+    """Start a question's checkpoint over for a new keyword list"""
+    stmt = upsert_insert(db, GDPIRescoreCheckpoint).values(
+        question_id=question_id, keywords=keywords_json, last_response_id=0, rescored=0,
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["question_id"],
+        set_={"keywords": keywords_json, "last_response_id": 0, "rescored": 0},
+    ))
+    await db.commit()
+
+
+async def _count_remaining(db, question_id: int, after_id: int) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(GDPIResponse).where(
+            GDPIResponse.question_id == question_id,
+            GDPIResponse.id > after_id,
+        )
+    )
+
+
+def score_responses(keywords: Tuple[str, ...], texts: List[str]) -> List[Tuple[float, str, str]]:
+    """Score response texts in a pool worker: [(score, matched keywords JSON, feedback)]"""
+    matcher = _worker_matcher(keywords)
+    scored = []
+    for text in texts:
+        score, matched_keywords = evaluate_gdpi_response(text, matcher)
+        scored.append((
+            score,
+            json.dumps(matched_keywords),
+            generate_gdpi_feedback(score, matched_keywords, matcher.keywords),
+        ))
+    return scored
+
+
+async def rescore_gdpi_question(
+    question_id: int,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Dict:
+    """
+    Rescore every stored response to a GDPI question against its current keywords
+    Responses are read in id-ordered keyset batches and scored across a
+    process pool. Each batch is written with a bulk update and a checkpoint
+    in its own transaction, so a rerun after an interruption continues
+    where it stopped, unless the keywords changed again in between.
+    The keywords are re-read before every batch; if they changed, the
+    rescore starts over with the new list.
+    """
+    report = progress or (lambda fraction, message="": None)
+    started = time.perf_counter()
+
+    async with AsyncSessionLocal() as db:
+        question = await db.get(GDPIQuestion, question_id)
+        if question is None:
+            raise ValueError(f"GDPI question {question_id} not found")
+        keywords_json = question.keywords
+        keywords = _parse_keywords(keywords_json)
+
+        checkpoint = await db.scalar(
+            select(GDPIRescoreCheckpoint).where(GDPIRescoreCheckpoint.question_id == question_id)
+        )
+        if checkpoint is not None and checkpoint.keywords == keywords_json:
+            resumed_from, rescored = checkpoint.last_response_id, checkpoint.rescored
+        else:
+            resumed_from, rescored = 0, 0
+            await _reset_checkpoint(db, question_id, keywords_json)
+
+        remaining = await _count_remaining(db, question_id, resumed_from)
+        total = rescored + remaining
+        report(rescored / max(total, 1), f"Rescoring {remaining} responses")
+
+        executor = get_rescore_executor()
+        loop = asyncio.get_running_loop()
+        changed = 0
+        last_id = resumed_from
+        while True:
+            current_json = await db.scalar(
+                select(GDPIQuestion.keywords).where(GDPIQuestion.id == question_id)
+            )
+            if current_json is None:
+                raise ValueError(f"GDPI question {question_id} not found")
+            if current_json != keywords_json:
+                # Edited mid-run: every response needs the new keywords, and
+                # the edit that requested a rerun is covered by this one
+                _rerun.discard(question_id)
+                keywords_json, keywords = current_json, _parse_keywords(current_json)
+                resumed_from, rescored, changed, last_id = 0, 0, 0, 0
+                await _reset_checkpoint(db, question_id, keywords_json)
+                total = await _count_remaining(db, question_id, 0)
+                report(0.0, f"Keywords changed, rescoring {total} responses")
+
+            # Keyset batches hold no cursor open across the checkpoint commits
+            rows = (await db.execute(
+                select(
+                    GDPIResponse.id, GDPIResponse.response_text, GDPIResponse.score,
+                    GDPIResponse.keywords_matched, GDPIResponse.feedback,
+                ).where(
+                    GDPIResponse.question_id == question_id,
+                    GDPIResponse.id > last_id,
+                ).order_by(GDPIResponse.id).limit(GDPI_RESCORE_BATCH_SIZE)
+            )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            # One chunk per worker
+            size = -(-len(rows) // GDPI_RESCORE_WORKERS)
+            chunks = [rows[start:start + size] for start in range(0, len(rows), size)]
+            scored = await asyncio.gather(*(
+                loop.run_in_executor(executor, score_responses, keywords, [row.response_text for row in chunk])
+                for chunk in chunks
+            ))
+
+            updates = [
+                {"id": row.id, "score": score, "keywords_matched": matched, "feedback": feedback}
+                for chunk, chunk_scores in zip(chunks, scored)
+                for row, (score, matched, feedback) in zip(chunk, chunk_scores)
+                if (row.score, row.keywords_matched, row.feedback) != (score, matched, feedback)
+            ]
+            if updates:
+                await db.execute(update(GDPIResponse), updates)
+            rescored += len(rows)
+            changed += len(updates)
+            await db.execute(
+                update(GDPIRescoreCheckpoint).where(
+                    GDPIRescoreCheckpoint.question_id == question_id
+                ).values(last_response_id=last_id, rescored=rescored)
+            )
+            await db.commit()
+            report(rescored / max(total, 1), f"Rescored {rescored}/{total} responses")
+
+        await db.execute(
+            delete(GDPIRescoreCheckpoint).where(GDPIRescoreCheckpoint.question_id == question_id)
+        )
+        await db.commit()
+
+    return {
+        "question_id": question_id,
+        "responses": rescored,
+        "changed": changed,
+        "resumed_from": resumed_from,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def start_gdpi_rescore(question_id: int) -> Job:
+    """
+    Rescore a question's responses in the background, or return the job already doing so
+    A job that is already running picks up new keywords before its next
+    batch, and runs once more if they change after its last one.
+    """
+    job = _running.get(question_id)
+    if job is not None and job.status in ("queued", "running"):
+        _rerun.add(question_id)
+        return job
+
+    job = jobs.create("gdpi-rescore")
+    _running[question_id] = job
+
+    async def run(job: Job) -> Dict:
+        try:
+            while True:
+                _rerun.discard(question_id)
+                result = await rescore_gdpi_question(question_id, job.update)
+                if question_id not in _rerun:
+                    return result
+        finally:
+            _running.pop(question_id, None)
+            _rerun.discard(question_id)
+
+    return jobs.start(job, run)
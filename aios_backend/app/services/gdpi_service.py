@@ -1,37 +1,56 @@
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from sqlalchemy import select, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional, Tuple
 import json
+from app.core.cache import TTLCache
+from app.core.config import GDPI_MATCHER_CACHE_SIZE
 from app.models.gdpi import GDPIQuestion, GDPIResponse
+from app.services.gdpi_bank import BankQuestion, get_question_bank, sample_questions
+from app.services.keyword_matcher import KeywordMatcher
 
+# Compiled keyword matchers keyed by (question id, keywords JSON), so an
+# edited keyword list gets a new entry instead of a stale hit
+matcher_cache = TTLCache(maxsize=GDPI_MATCHER_CACHE_SIZE, ttl=3600)
 
-def get_gdpi_questions(db: Session, limit: int = 10) -> List[GDPIQuestion]:
-    """Fetch curated GDPI questions"""
-    return db.query(GDPIQuestion).limit(limit).all()
 
+async def get_gdpi_questions(
+    db: AsyncSession,
+    limit: int = 10,
+    difficulty: Optional[str] = None,
+) -> List[BankQuestion]:
+    """Fetch a random selection of curated GDPI questions"""
+    return sample_questions(await get_question_bank(db), limit, difficulty=difficulty)
 
-def get_gdpi_questions_by_category(
-    db: Session,
+
+async def get_gdpi_questions_by_category(
+    db: AsyncSession,
     category: str,
     limit: int = 5,
-) -> List[GDPIQuestion]:
-    """Fetch GDPI questions by category"""
-    return db.query(GDPIQuestion).filter(
-        GDPIQuestion.category == category
-    ).limit(limit).all()
+    difficulty: Optional[str] = None,
+) -> List[BankQuestion]:
+    """Fetch a random selection of GDPI questions from a category"""
+    return sample_questions(await get_question_bank(db), limit, category, difficulty)
+
 
+def get_keyword_matcher(question: GDPIQuestion) -> KeywordMatcher:
+    """Get the compiled keyword matcher for a question, building it on a miss"""
+    key = (question.id, question.keywords)
+    matcher = matcher_cache.get(key)
+    if matcher is None:
+        keywords = json.loads(question.keywords) if isinstance(question.keywords, str) else question.keywords
+        matcher = KeywordMatcher(keywords)
+        matcher_cache.set(key, matcher)
+    return matcher
 
-def evaluate_gdpi_response(response_text: str, keywords: List[str]) -> tuple:
+
+def evaluate_gdpi_response(response_text: str, matcher: KeywordMatcher) -> tuple:
     """
     Rule-based evaluation of GDPI response
+    Keywords must appear as whole words or phrases.
     Returns: (score, matched_keywords)
     """
-    response_lower = response_text.lower()
-    matched_keywords = []
-    
-    # Count matched keywords
-    for keyword in keywords:
-        if keyword.lower() in response_lower:
-            matched_keywords.append(keyword)
+    keywords = matcher.keywords
+    matched_keywords = matcher.find(response_text)
     
     # Calculate score based on keyword matches (0-10 scale)
     if not keywords:
@@ -48,45 +67,61 @@ def evaluate_gdpi_response(response_text: str, keywords: List[str]) -> tuple:
     return round(score, 2), matched_keywords
 
 
-def submit_gdpi_response(
-    db: Session,
+async def submit_gdpi_batch(
+    db: AsyncSession,
+    student_id: int,
+    responses: List[Tuple[int, str]],
+) -> List[GDPIResponse]:
+    """
+    Evaluate and store a batch of GDPI responses in one transaction
+    responses: [(question_id, response_text)]
+    All questions are loaded in one query and the responses are written
+    with one bulk insert; nothing is stored if any question is missing.
+    """
+    if not responses:
+        return []
+    
+    question_ids = {question_id for question_id, _ in responses}
+    questions = {
+        question.id: question
+        for question in (await db.scalars(
+            select(GDPIQuestion).where(GDPIQuestion.id.in_(question_ids))
+        )).all()
+    }
+    missing = sorted(question_ids - questions.keys())
+    if missing:
+        raise ValueError(f"Question {missing[0]} not found")
+    
+    rows = []
+    for question_id, response_text in responses:
+        # Evaluate with the question's compiled keywords
+        matcher = get_keyword_matcher(questions[question_id])
+        score, matched_keywords = evaluate_gdpi_response(response_text, matcher)
+        rows.append({
+            "student_id": student_id,
+            "question_id": question_id,
+            "response_text": response_text,
+            "score": score,
+            "keywords_matched": json.dumps(matched_keywords),
+            "feedback": generate_gdpi_feedback(score, matched_keywords, matcher.keywords),
+        })
+    
+    stored = (await db.scalars(
+        insert(GDPIResponse).returning(GDPIResponse, sort_by_parameter_order=True),
+        rows,
+    )).all()
+    await db.commit()
+    return stored
+
+
+async def submit_gdpi_response(
+    db: AsyncSession,
     student_id: int,
     question_id: int,
     response_text: str,
 ) -> GDPIResponse:
     """Submit and evaluate a GDPI response"""
-    # Get the question
-    question = db.query(GDPIQuestion).filter(
-        GDPIQuestion.id == question_id
-    ).first()
-    
-    if not question:
-        raise ValueError(f"Question {question_id} not found")
-    
-    # Parse keywords from JSON
-    keywords = json.loads(question.keywords) if isinstance(question.keywords, str) else question.keywords
-    
-    # Evaluate response
-    score, matched_keywords = evaluate_gdpi_response(response_text, keywords)
-    
-    # Generate feedback
-    feedback = generate_gdpi_feedback(score, matched_keywords, keywords)
-    
-    # Create response record
-    gdpi_response = GDPIResponse(
-        student_id=student_id,
-        question_id=question_id,
-        response_text=response_text,
-        score=score,
-        keywords_matched=json.dumps(matched_keywords),
-        feedback=feedback,
-    )
-    
-    db.add(gdpi_response)
-    db.commit()
-    db.refresh(gdpi_response)
-    
-    return gdpi_response
+    return (await submit_gdpi_batch(db, student_id, [(question_id, response_text)]))[0]
 
 
 def generate_gdpi_feedback(
@@ -107,26 +142,66 @@ def generate_gdpi_feedback(
     return feedback
 
 
-def get_student_gdpi_responses(
-    db: Session,
+async def get_student_gdpi_stats(db: AsyncSession, student_id: int) -> Dict:
+    """Get a student's GDPI response count and scores, overall and per category, aggregated in SQL"""
+    rows = (await db.execute(
+        select(
+            GDPIQuestion.category,
+            func.count(GDPIResponse.id).label("responses"),
+            func.sum(GDPIResponse.score).label("score_sum"),
+            func.max(GDPIResponse.score).label("best_score"),
+            func.min(GDPIResponse.score).label("worst_score"),
+        ).join(GDPIQuestion, GDPIQuestion.id == GDPIResponse.question_id).where(
+            GDPIResponse.student_id == student_id
+        ).group_by(GDPIQuestion.category).order_by(GDPIQuestion.category)
+    )).all()
+    
+    total = sum(row.responses for row in rows)
+    return {
+        "total_responses": total,
+        "average_score": round(sum(row.score_sum for row in rows) / total, 2) if total else 0,
+        "best_score": max(row.best_score for row in rows) if rows else None,
+        "worst_score": min(row.worst_score for row in rows) if rows else None,
+        "by_category": [
+            {
+                "category": row.category,
+                "responses": row.responses,
+                "average_score": round(row.score_sum / row.responses, 2),
+                "best_score": row.best_score,
+                "worst_score": row.worst_score,
+            }
+            for row in rows
+        ],
+    }
+
+
+async def get_student_gdpi_history(
+    db: AsyncSession,
     student_id: int,
+    before: Optional[int] = None,
+    limit: int = 20,
+    include_text: bool = True,
 ) -> Dict:
-    """Get all GDPI responses for a student with average score"""
-    responses = db.query(GDPIResponse).filter(
-        GDPIResponse.student_id == student_id
-    ).all()
-    
-    if not responses:
-        return {
-            "total_responses": 0,
-            "average_score": 0,
-            "responses": [],
-        }
+    """
+    Get a page of a student's GDPI responses, newest first
+    Pass next_cursor as `before` for the next page. Without include_text
+    the response bodies are not read at all.
+    """
+    columns = [
+        GDPIResponse.id, GDPIResponse.student_id, GDPIResponse.question_id,
+        GDPIResponse.score, GDPIResponse.feedback, GDPIResponse.created_at,
+    ]
+    if include_text:
+        columns.append(GDPIResponse.response_text)
     
-    average_score = sum(r.score for r in responses) / len(responses)
+    stmt = select(*columns).where(GDPIResponse.student_id == student_id)
+    if before is not None:
+        stmt = stmt.where(GDPIResponse.id < before)
+    rows = (await db.execute(stmt.order_by(GDPIResponse.id.desc()).limit(limit + 1))).all()
     
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     return {
-        "total_responses": len(responses),
-        "average_score": round(average_score, 2),
-        "responses": responses,
+        "items": [row._asdict() for row in rows],
+        "next_cursor": rows[-1].id if has_more else None,
     }
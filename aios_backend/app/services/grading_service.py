@@ -0,0 +1,79 @@
+from typing import Dict, Optional, Tuple
+import asyncio
+from app.core.config import GRADING_WORKERS
+from app.core.database import AsyncSessionLocal
+from app.core.jobs import Job, jobs
+from app.schemas import TestAnalysisResponse
+from app.services.weak_topic_service import get_test_analysis
+
+
+class GradingQueue:
+    """
+    In-process queue of test analyses worked off by a fixed number of workers
+    Submissions only persist answers and enqueue; at most `workers` analyses
+    hold a database connection at a time however many students submit at
+    once. A student who submits again while their analysis is still queued
+    shares the queued job.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop = None
+        self._tasks = set()
+        self._pending: Dict[Tuple[int, int], Job] = {}
+        self._running = 0
+        self.completed = 0
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._pending.clear()
+        self._tasks = set()
+        for _ in range(self.workers):
+            task = asyncio.create_task(self._work())
+            self._tasks.add(task)
+
+    def enqueue(self, student_id: int, test_id: int) -> Job:
+        """Queue an analysis of a student's answers and return its job"""
+        self._ensure_workers()
+        key = (student_id, test_id)
+        job = self._pending.get(key)
+        if job is None:
+            job = jobs.create("grading", owner_id=student_id)
+            self._pending[key] = job
+            self._queue.put_nowait((key, job))
+        return job
+
+    async def _work(self):
+        while True:
+            key, job = await self._queue.get()
+            # Answers submitted from here on need a new job
+            self._pending.pop(key, None)
+            self._running += 1
+            try:
+                await jobs.run(job, lambda job: self._analyze(*key))
+            finally:
+                self._running -= 1
+                self.completed += 1
+                self._queue.task_done()
+
+    async def _analyze(self, student_id: int, test_id: int) -> Dict:
+        async with AsyncSessionLocal() as db:
+            analysis = await get_test_analysis(db, student_id, test_id)
+            # Weak topics are ORM rows; the job keeps a plain JSON copy
+            return TestAnalysisResponse.model_validate(analysis).model_dump(mode="json")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "completed": self.completed,
+        }
+
+
+grading_queue = GradingQueue(GRADING_WORKERS)
@@ -0,0 +1,190 @@
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from typing import AsyncIterator, Dict, Iterator, List, Tuple, Union
+from datetime import datetime
+import codecs
+import csv
+import json
+from app.models.test import Question
+from app.models.topic import topic_registry
+from app.schemas import QuestionCreate
+from app.services.test_cache import bump_test_versions, invalidate_test
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 100  # Row errors listed in the report; all of them are counted
+IMPORT_FORMATS = ("ndjson", "csv")
+IMPORT_COLUMNS = ("test_id", "question_text", "topic_id", "correct_answer", "options", "difficulty", "created_at")
+
+
+class ImportRowError(ValueError):
+    """A row that cannot be imported"""
+
+
+def _lines(decoder, chunk: bytes, buffer: List[str], final: bool = False) -> Iterator[str]:
+    """Split decoded text into complete lines, keeping a partial last line in buffer"""
+    text = buffer.pop() if buffer else ""
+    text += decoder.decode(chunk, final)
+    lines = text.split("\n")
+    tail = lines.pop()
+    if final:
+        if tail:
+            lines.append(tail)
+    else:
+        buffer.append(tail)
+    for line in lines:
+        yield line.rstrip("\r")
+
+
+async def iter_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Union[Dict, ImportRowError]]]:
+    """
+    Parse an uploaded question file as it arrives
+    Yields (row number, fields) or (row number, ImportRowError). CSV files
+    need a header row; quoted fields may span lines.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer: List[str] = []
+    header = None
+    record = ""
+    row_number = 0
+
+    def parse(line: str):
+        nonlocal header, record, row_number
+        if fmt == "ndjson":
+            if not line.strip():
+                return None
+            row_number += 1
+            try:
+                fields = json.loads(line)
+            except ValueError as e:
+                return ImportRowError(f"Invalid JSON: {e}")
+            if not isinstance(fields, dict):
+                return ImportRowError("Expected a JSON object")
+            return fields
+
+        # A CSV record is complete once its quotes are balanced
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            return None
+        line, record = record, ""
+        if not line.strip():
+            return None
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            return None
+        row_number += 1
+        if len(values) != len(header):
+            return ImportRowError(f"Expected {len(header)} columns, got {len(values)}")
+        return dict(zip(header, values))
+
+    async for chunk in chunks:
+        for line in _lines(decoder, chunk, buffer):
+            fields = parse(line)
+            if fields is not None:
+                yield row_number, fields
+    for line in _lines(decoder, b"", buffer, final=True):
+        fields = parse(line)
+        if fields is not None:
+            yield row_number, fields
+    if record:
+        yield row_number + 1, ImportRowError("Unterminated quoted field")
+
+
+def validate_row(fields: Dict) -> QuestionCreate:
+    """Check one imported row, raising ImportRowError with a readable reason"""
+    # Empty optional CSV cells fall back to the defaults
+    fields = {
+        key: value for key, value in fields.items()
+        if not (key in ("options", "difficulty") and value in ("", None))
+    }
+    if isinstance(fields.get("options"), (list, dict)):
+        fields["options"] = json.dumps(fields["options"])
+    try:
+        question = QuestionCreate.model_validate(fields)
+    except ValidationError as e:
+        raise ImportRowError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    for name in ("question_text", "topic", "correct_answer"):
+        if not getattr(question, name).strip():
+            raise ImportRowError(f"{name}: must not be empty")
+    return question
+
+
+async def _insert_questions(db: AsyncSession, rows: List[Dict]) -> None:
+    """Insert a batch of questions, with COPY on PostgreSQL"""
+    if db.bind.dialect.name == "postgresql":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Question.__tablename__,
+            records=[tuple(row[column] for column in IMPORT_COLUMNS) for row in rows],
+            columns=list(IMPORT_COLUMNS),
+        )
+    else:
+        await db.execute(insert(Question), rows)
+
+
+async def import_questions(
+    db: AsyncSession,
+    test_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+) -> Dict:
+    """
+    Stream questions from an upload into a test
+    Rows are validated as they are parsed and inserted IMPORT_BATCH_SIZE at
+    a time. Invalid rows are reported and skipped; valid ones are
+    committed together at the end.
+    """
+    imported = 0
+    failed = 0
+    errors = []
+    batch: List[QuestionCreate] = []
+
+    async def flush():
+        nonlocal imported
+        topic_ids = await topic_registry.intern(db, {question.topic.strip() for question in batch})
+        now = datetime.utcnow()
+        await _insert_questions(db, [
+            {
+                "test_id": test_id,
+                "question_text": question.question_text,
+                "topic_id": topic_ids[question.topic.strip()],
+                "correct_answer": question.correct_answer,
+                "options": question.options,
+                "difficulty": question.difficulty,
+                "created_at": now,
+            }
+            for question in batch
+        ])
+        imported += len(batch)
+        batch.clear()
+
+    async for row_number, fields in iter_rows(chunks, fmt):
+        try:
+            if isinstance(fields, ImportRowError):
+                raise fields
+            batch.append(validate_row(fields))
+        except ImportRowError as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"row": row_number, "error": str(e)})
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+    if imported:
+        await db.execute(bump_test_versions([test_id]))
+    await db.commit()
+    invalidate_test(test_id)
+
+    return {
+        "test_id": test_id,
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+    }
@@ -0,0 +1,321 @@
+from sqlalchemy import select, update, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+from datetime import datetime
+import asyncio
+import logging
+import math
+from app.core.config import ITEM_STATS_FOLD_INTERVAL
+from app.core.database import AsyncSessionLocal, upsert_insert
+from app.models.test import (
+    Question, QuestionStat, QuestionOptionCount, QuestionStatDelta, QuestionOptionDelta, TestResult,
+)
+from app.models.topic import topic_registry
+from app.services.test_cache import get_test_definition, normalize_answer, parse_options
+
+# Answers to a multiple choice question that match none of its options
+OTHER_OPTION = "__other__"
+
+# Item analysis flags
+ITEM_MIN_RESPONSES = 10  # Below this, indices are reported but not flagged
+ITEM_EASY_P_VALUE = 0.9
+ITEM_HARD_P_VALUE = 0.2
+ITEM_MIN_DISCRIMINATION = 0.2
+
+STAT_FIELDS = ("responses", "correct", "score_sum", "score_sq_sum", "correct_score_sum")
+
+logger = logging.getLogger(__name__)
+
+
+def answer_option(student_answer: str, options: Tuple[str, ...]) -> str:
+    """The option an answer counts towards in the distractor frequencies"""
+    normalized = normalize_answer(student_answer)
+    return normalized if normalized in options else OTHER_OPTION
+
+
+def _contribution(is_correct: int, score: int) -> Tuple[int, ...]:
+    """One student's share of each QuestionStat sum"""
+    return (1, is_correct, score, score * score, is_correct * score)
+
+
+async def record_item_responses(
+    db: AsyncSession,
+    student_id: int,
+    test_id: int,
+    old_state: Dict[int, Tuple[int, str]],
+    new_state: Dict[int, Tuple[int, str]],
+) -> None:
+    """
+    Move a student's contribution to the question statistics from old_state to new_state
+    States map question_id -> (is_correct, student_answer) for the latest answer
+    to each question. A change in the student's test score shifts their
+    contribution to every question they answered, not just the new ones.
+    The change is appended to the delta logs and folded in later.
+    """
+    item_stats_folder.ensure_running()
+    counted = await db.scalar(
+        select(TestResult.item_stats_counted).where(
+            TestResult.student_id == student_id,
+            TestResult.test_id == test_id,
+        )
+    )
+    if not counted:
+        # Answers stored before item analysis were never added
+        old_state = {}
+
+    definition = await get_test_definition(db, test_id)
+    options = definition.options if definition else {}
+    old_score = sum(is_correct for is_correct, _ in old_state.values())
+    new_score = sum(is_correct for is_correct, _ in new_state.values())
+
+    stat_rows = []
+    option_deltas = Counter()
+    for question_id in sorted(old_state.keys() | new_state.keys()):
+        delta = [0] * len(STAT_FIELDS)
+        if question_id in old_state:
+            is_correct, student_answer = old_state[question_id]
+            for i, value in enumerate(_contribution(is_correct, old_score)):
+                delta[i] -= value
+            if question_id in options:
+                option_deltas[(question_id, answer_option(student_answer, options[question_id]))] -= 1
+        if question_id in new_state:
+            is_correct, student_answer = new_state[question_id]
+            for i, value in enumerate(_contribution(is_correct, new_score)):
+                delta[i] += value
+            if question_id in options:
+                option_deltas[(question_id, answer_option(student_answer, options[question_id]))] += 1
+        if any(delta):
+            stat_rows.append({"question_id": question_id, "test_id": test_id, **dict(zip(STAT_FIELDS, delta))})
+
+    if stat_rows:
+        await db.execute(insert(QuestionStatDelta), stat_rows)
+
+    option_rows = [
+        {"question_id": question_id, "test_id": test_id, "option": option, "count": count}
+        for (question_id, option), count in sorted(option_deltas.items())
+        if count
+    ]
+    if option_rows:
+        await db.execute(insert(QuestionOptionDelta), option_rows)
+
+    if not counted:
+        await db.execute(
+            update(TestResult).where(
+                TestResult.student_id == student_id,
+                TestResult.test_id == test_id,
+            ).values(item_stats_counted=1)
+        )
+
+
+async def fold_item_stats(db: AsyncSession, test_id: Optional[int] = None) -> int:
+    """
+    Add logged deltas into question_stats and question_option_counts, for one test or all
+    Deltas are claimed with DELETE ... RETURNING, so each is folded exactly
+    once even when several workers fold at the same time. Rows are written
+    in key order. Returns the number of deltas folded.
+    """
+    stat_filter = () if test_id is None else (QuestionStatDelta.test_id == test_id,)
+    option_filter = () if test_id is None else (QuestionOptionDelta.test_id == test_id,)
+    stat_deltas = (await db.execute(
+        delete(QuestionStatDelta).where(*stat_filter).returning(
+            QuestionStatDelta.question_id, QuestionStatDelta.test_id,
+            *(getattr(QuestionStatDelta, field) for field in STAT_FIELDS),
+        )
+    )).all()
+    option_deltas = (await db.execute(
+        delete(QuestionOptionDelta).where(*option_filter).returning(
+            QuestionOptionDelta.question_id, QuestionOptionDelta.test_id,
+            QuestionOptionDelta.option, QuestionOptionDelta.count,
+        )
+    )).all()
+
+    stat_sums: Dict[Tuple[int, int], List[int]] = {}
+    for question_id, delta_test_id, *values in stat_deltas:
+        sums = stat_sums.setdefault((question_id, delta_test_id), [0] * len(STAT_FIELDS))
+        for i, value in enumerate(values):
+            sums[i] += value
+    option_sums = Counter()
+    for question_id, delta_test_id, option, count in option_deltas:
+        option_sums[(question_id, delta_test_id, option)] += count
+
+    if stat_sums:
+        now = datetime.utcnow()
+        stmt = upsert_insert(db, QuestionStat)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["question_id"],
+            set_={
+                **{field: getattr(QuestionStat, field) + stmt.excluded[field] for field in STAT_FIELDS},
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await db.execute(stmt, [
+            {"question_id": question_id, "test_id": delta_test_id, **dict(zip(STAT_FIELDS, sums)), "updated_at": now}
+            for (question_id, delta_test_id), sums in sorted(stat_sums.items())
+        ])
+    if option_sums:
+        stmt = upsert_insert(db, QuestionOptionCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["question_id", "option"],
+            set_={"count": QuestionOptionCount.count + stmt.excluded.count},
+        )
+        await db.execute(stmt, [
+            {"question_id": question_id, "test_id": delta_test_id, "option": option, "count": count}
+            for (question_id, delta_test_id, option), count in sorted(option_sums.items())
+        ])
+
+    await db.commit()
+    return len(stat_deltas) + len(option_deltas)
+
+
+class ItemStatsFolder:
+    """Folds the item analysis delta logs of every test in the background"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._loop = None
+        self._task = None
+        self.folds = 0
+        self.deltas_folded = 0
+
+    def ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    self.deltas_folded += await fold_item_stats(db)
+                self.folds += 1
+            except Exception:
+                logger.exception("Folding item analysis deltas failed")
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "folds": self.folds,
+            "deltas_folded": self.deltas_folded,
+        }
+
+
+item_stats_folder = ItemStatsFolder(ITEM_STATS_FOLD_INTERVAL)
+
+
+async def replace_item_stats(
+    db: AsyncSession,
+    test_id: int,
+    stat_rows: List[Dict],
+    option_rows: List[Dict],
+) -> None:
+    """
+    Overwrite a test's question statistics with totals computed from all answers
+    Callers must also set item_stats_counted on the students they covered.
+    Logged deltas are dropped, since the answers they came from are counted.
+    """
+    now = datetime.utcnow()
+    await db.execute(delete(QuestionStatDelta).where(QuestionStatDelta.test_id == test_id))
+    await db.execute(delete(QuestionOptionDelta).where(QuestionOptionDelta.test_id == test_id))
+    await db.execute(delete(QuestionStat).where(QuestionStat.test_id == test_id))
+    await db.execute(delete(QuestionOptionCount).where(QuestionOptionCount.test_id == test_id))
+    if stat_rows:
+        await db.execute(insert(QuestionStat), [
+            {**row, "test_id": test_id, "updated_at": now} for row in stat_rows
+        ])
+    if option_rows:
+        await db.execute(insert(QuestionOptionCount), [
+            {**row, "test_id": test_id} for row in option_rows
+        ])
+
+
+def point_biserial(stat: QuestionStat) -> Optional[float]:
+    """Correlation between answering the question correctly and the test score"""
+    n, n1 = stat.responses, stat.correct
+    if n == 0 or n1 == 0 or n1 == n:
+        return None
+
+    mean = stat.score_sum / n
+    variance = stat.score_sq_sum / n - mean * mean
+    if variance <= 0:
+        return None
+
+    mean_correct = stat.correct_score_sum / n1
+    mean_incorrect = (stat.score_sum - stat.correct_score_sum) / (n - n1)
+    p = n1 / n
+    return (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+
+
+def item_flags(responses: int, p_value: Optional[float], discrimination: Optional[float]) -> List[str]:
+    """Review flags for a question with enough responses"""
+    if responses < ITEM_MIN_RESPONSES or p_value is None:
+        return []
+
+    flags = []
+    if p_value > ITEM_EASY_P_VALUE:
+        flags.append("too_easy")
+    elif p_value < ITEM_HARD_P_VALUE:
+        flags.append("too_hard")
+    if discrimination is not None:
+        if discrimination < 0:
+            flags.append("negative_discrimination")
+        elif discrimination < ITEM_MIN_DISCRIMINATION:
+            flags.append("low_discrimination")
+    return flags
+
+
+async def get_item_analysis(db: AsyncSession, test_id: int) -> List[Dict]:
+    """Get difficulty, discrimination and distractor frequencies for each question of a test"""
+    await fold_item_stats(db, test_id)
+    questions = (await db.execute(
+        select(Question.id, Question.topic_id, Question.correct_answer, Question.options)
+        .where(Question.test_id == test_id)
+        .order_by(Question.id)
+    )).all()
+    await topic_registry.ensure(db, {question.topic_id for question in questions})
+    stats = {
+        stat.question_id: stat
+        for stat in (await db.scalars(
+            select(QuestionStat).where(QuestionStat.test_id == test_id)
+        )).all()
+    }
+    option_counts = {}
+    for question_id, option, count in (await db.execute(
+        select(QuestionOptionCount.question_id, QuestionOptionCount.option, QuestionOptionCount.count)
+        .where(QuestionOptionCount.test_id == test_id)
+    )).all():
+        option_counts[(question_id, option)] = count
+
+    analysis = []
+    for question_id, topic_id, correct_answer, raw_options in questions:
+        stat = stats.get(question_id)
+        responses = stat.responses if stat else 0
+        p_value = stat.correct / responses if responses else None
+        discrimination = point_biserial(stat) if stat else None
+
+        correct = normalize_answer(correct_answer)
+        distractors = [
+            {
+                "option": option,
+                "count": option_counts.get((question_id, option), 0),
+                "share": round(option_counts.get((question_id, option), 0) / responses, 4) if responses else 0.0,
+                "is_correct": option == correct,
+            }
+            for option in parse_options(raw_options)
+        ]
+
+        analysis.append({
+            "question_id": question_id,
+            "topic": topic_registry.name(topic_id),
+            "responses": responses,
+            "p_value": round(p_value, 4) if p_value is not None else None,
+            "discrimination": round(discrimination, 4) if discrimination is not None else None,
+            "distractors": distractors,
+            "other_responses": option_counts.get((question_id, OTHER_OPTION), 0),
+            "flags": item_flags(responses, p_value, discrimination),
+        })
+
+    return analysis
@@ -0,0 +1,83 @@
+from collections import deque
+from typing import Dict, List, Set
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace runs so phrases match across line breaks"""
+    return " ".join(text.lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword list
+    Finds every keyword in one pass over the text. A keyword only matches
+    as a whole word: an edge that is a letter or digit must not be
+    directly preceded or followed by one in the text, so "ssl" does not
+    match inside "tussle" while "c++" still matches before punctuation.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # state -> (pattern length, checks start boundary, checks end boundary, keyword indexes)
+        self._output: List[List[tuple]] = [[]]
+
+        patterns: Dict[str, List[int]] = {}
+        for index, keyword in enumerate(self.keywords):
+            pattern = normalize_text(keyword)
+            if pattern:
+                patterns.setdefault(pattern, []).append(index)
+
+        for pattern, indexes in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append((
+                len(pattern),
+                _is_word_char(pattern[0]),
+                _is_word_char(pattern[-1]),
+                indexes,
+            ))
+
+        # Breadth-first failure links; outputs of suffix states are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> List[str]:
+        """Keywords found in the text, in keyword list order"""
+        text = normalize_text(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, check_start, check_end, indexes in output[state]:
+                start = end - length + 1
+                if check_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if check_end and end + 1 < len(text) and _is_word_char(text[end + 1]):
+                    continue
+                found.update(indexes)
+        return [self.keywords[index] for index in sorted(found)]
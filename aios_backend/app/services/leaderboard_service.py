@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import LEADERBOARD_CACHE_TTL, LEADERBOARD_CACHE_SIZE
+from app.models.test import TestResult
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class Leaderboard:
+    """Ranked snapshot of a test's analyzed results"""
+    test_id: int
+    entries: Tuple[Dict, ...]  # Ordered by rank, then student id
+    positions: Dict[int, int]  # student_id -> index into entries
+
+
+# Leaderboards keyed by test id, dropped whenever a result of the test is analyzed
+leaderboard_cache = TTLCache(maxsize=LEADERBOARD_CACHE_SIZE, ttl=LEADERBOARD_CACHE_TTL)
+
+
+def invalidate_leaderboard(test_id: int):
+    """Drop a cached leaderboard after results of the test change"""
+    leaderboard_cache.pop(test_id)
+
+
+async def get_leaderboard(db: AsyncSession, test_id: int) -> Leaderboard:
+    """
+    Get a test's leaderboard from the cache, ranking it on a miss
+    Rank and percentile come from window functions over each student's
+    latest analyzed score; students without answers are left out. Tied
+    scores share a rank; the percentile is the share of students who
+    scored lower.
+    """
+    leaderboard = leaderboard_cache.get(test_id)
+    if leaderboard is not None:
+        return leaderboard
+
+    rows = (await db.execute(
+        select(
+            TestResult.student_id,
+            User.name,
+            TestResult.overall_score,
+            func.rank().over(order_by=TestResult.overall_score.desc()).label("rank"),
+            func.percent_rank().over(order_by=TestResult.overall_score).label("percent_rank"),
+        ).join(User, User.id == TestResult.student_id).where(
+            TestResult.test_id == test_id,
+            TestResult.analyzed_version >= 0,
+            TestResult.total_questions > 0,
+        ).order_by(TestResult.overall_score.desc(), TestResult.student_id)
+    )).all()
+
+    entries = tuple(
+        {
+            "student_id": row.student_id,
+            "student_name": row.name,
+            "score": row.overall_score,
+            "rank": row.rank,
+            "percentile": round(row.percent_rank * 100, 2),
+        }
+        for row in rows
+    )
+    leaderboard = Leaderboard(
+        test_id=test_id,
+        entries=entries,
+        positions={entry["student_id"]: i for i, entry in enumerate(entries)},
+    )
+    leaderboard_cache.set(test_id, leaderboard)
+    return leaderboard
+
+
+async def get_student_standing(db: AsyncSession, test_id: int, student_id: int) -> Optional[Dict]:
+    """Get a student's score, rank and percentile on a test, or None without analyzed answers"""
+    leaderboard = await get_leaderboard(db, test_id)
+    position = leaderboard.positions.get(student_id)
+    if position is None:
+        return None
+
+    entry = leaderboard.entries[position]
+    return {
+        "test_id": test_id,
+        "score": entry["score"],
+        "rank": entry["rank"],
+        "percentile": entry["percentile"],
+        "participants": len(leaderboard.entries),
+    }
@@ -0,0 +1,95 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+from datetime import datetime
+from app.core.config import MASTERY_EWMA_ALPHA
+from app.core.database import chunks, upsert_insert
+from app.models.test import Test
+from app.models.topic import topic_registry
+from app.models.weak_topic import TopicMastery
+
+MASTERY_BATCH_SIZE = 1000
+
+
+async def record_topic_mastery(db: AsyncSession, points: List[Dict]) -> None:
+    """
+    Store per-topic test scores and refresh the affected mastery series
+    points: [{student_id, test_id, topic_id, score}]
+    A point keeps its place in the series when a test is re-analyzed; only
+    its score changes, and mastery is recomputed along the series.
+    """
+    if not points:
+        return
+
+    now = datetime.utcnow()
+    stmt = upsert_insert(db, TopicMastery)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "topic_id", "test_id"],
+        set_={"score": stmt.excluded.score, "updated_at": stmt.excluded.updated_at},
+    )
+    for chunk in chunks(points, MASTERY_BATCH_SIZE):
+        await db.execute(stmt, [
+            {**point, "mastery": point["score"], "recorded_at": now, "updated_at": now}
+            for point in chunk
+        ])
+
+    # Recompute the moving average along each affected series
+    affected = {(point["student_id"], point["topic_id"]) for point in points}
+    topic_ids = {topic_id for _, topic_id in affected}
+    updates = []
+    for student_ids in chunks(sorted({student_id for student_id, _ in affected}), MASTERY_BATCH_SIZE):
+        rows = (await db.execute(
+            select(
+                TopicMastery.id, TopicMastery.student_id, TopicMastery.topic_id,
+                TopicMastery.score, TopicMastery.mastery,
+            ).where(
+                TopicMastery.student_id.in_(student_ids),
+                TopicMastery.topic_id.in_(topic_ids),
+            ).order_by(
+                TopicMastery.student_id, TopicMastery.topic_id,
+                TopicMastery.recorded_at, TopicMastery.test_id,
+            )
+        )).all()
+
+        series, mastery = None, None
+        for row in rows:
+            if (row.student_id, row.topic_id) not in affected:
+                continue
+            if (row.student_id, row.topic_id) != series:
+                series, mastery = (row.student_id, row.topic_id), None
+            mastery = row.score if mastery is None else (
+                MASTERY_EWMA_ALPHA * row.score + (1 - MASTERY_EWMA_ALPHA) * mastery
+            )
+            if row.mastery != round(mastery, 2):
+                updates.append({"id": row.id, "mastery": round(mastery, 2)})
+
+    for chunk in chunks(updates, MASTERY_BATCH_SIZE):
+        await db.execute(update(TopicMastery), chunk)
+
+
+async def get_topic_mastery_trend(db: AsyncSession, student_id: int, topic: str) -> List[Dict]:
+    """Get a student's mastery series for a topic, oldest test first"""
+    topic_ids = await topic_registry.lookup(db, [topic])
+    if topic not in topic_ids:
+        return []
+
+    rows = (await db.execute(
+        select(
+            TopicMastery.test_id, Test.title, TopicMastery.score,
+            TopicMastery.mastery, TopicMastery.recorded_at,
+        ).join(Test, Test.id == TopicMastery.test_id).where(
+            TopicMastery.student_id == student_id,
+            TopicMastery.topic_id == topic_ids[topic],
+        ).order_by(TopicMastery.recorded_at, TopicMastery.test_id)
+    )).all()
+
+    return [
+        {
+            "test_id": row.test_id,
+            "test_title": row.title,
+            "score": row.score,
+            "mastery": row.mastery,
+            "recorded_at": row.recorded_at,
+        }
+        for row in rows
+    ]
@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, List
 import json
 from app.models.placement import PlacementProfile
@@ -6,7 +7,7 @@ from app.core.config import DOMAIN_KEYWORDS
 
 
 def analyze_placement_profile(
-    db: Session,
+    db: AsyncSession,
     student_id: int,
     skills: List[str],
     projects: List[str] = None,
@@ -57,8 +58,8 @@ def analyze_placement_profile(
     }
 
 
-def create_or_update_placement_profile(
-    db: Session,
+async def create_or_update_placement_profile(
+    db: AsyncSession,
     student_id: int,
     skills: List[str],
     projects: List[str] = None,
@@ -68,9 +69,7 @@ def create_or_update_placement_profile(
     """Create or update placement profile for a student"""
     
     # Check if profile exists
-    profile = db.query(PlacementProfile).filter(
-        PlacementProfile.student_id == student_id
-    ).first()
+    profile = await get_placement_profile(db, student_id)
     
     # Analyze profile
     analysis = analyze_placement_profile(db, student_id, skills, projects, cgpa, experience)
@@ -96,30 +95,36 @@ def create_or_update_placement_profile(
         )
         db.add(profile)
     
-    db.commit()
-    db.refresh(profile)
+    await db.commit()
+    await db.refresh(profile)
     
     return profile
 
 
-def get_placement_profile(db: Session, student_id: int) -> PlacementProfile:
+async def get_placement_profile(db: AsyncSession, student_id: int) -> PlacementProfile:
     """Get placement profile for a student"""
-    return db.query(PlacementProfile).filter(
-        PlacementProfile.student_id == student_id
-    ).first()
+    return await db.scalar(
+        select(PlacementProfile).where(
+            PlacementProfile.student_id == student_id
+        )
+    )
 
 
-def get_students_by_domain(db: Session, domain: str) -> List[PlacementProfile]:
+async def get_students_by_domain(db: AsyncSession, domain: str) -> List[PlacementProfile]:
     """Get all students for a specific domain"""
-    profiles = db.query(PlacementProfile).filter(
-        PlacementProfile.best_fit_domain == domain
-    ).all()
+    profiles = (await db.scalars(
+        select(PlacementProfile).where(
+            PlacementProfile.best_fit_domain == domain
+        )
+    )).all()
     return profiles
 
 
-def get_top_students_by_domain(db: Session, domain: str, limit: int = 10) -> List[PlacementProfile]:
+async def get_top_students_by_domain(db: AsyncSession, domain: str, limit: int = 10) -> List[PlacementProfile]:
     """Get top students by CGPA for a specific domain"""
-    profiles = db.query(PlacementProfile).filter(
-        PlacementProfile.best_fit_domain == domain
-    ).order_by(PlacementProfile.cgpa.desc()).limit(limit).all()
+    profiles = (await db.scalars(
+        select(PlacementProfile).where(
+            PlacementProfile.best_fit_domain == domain
+        ).order_by(PlacementProfile.cgpa.desc()).limit(limit)
+    )).all()
     return profiles
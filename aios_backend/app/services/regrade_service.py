@@ -0,0 +1,310 @@
+from sqlalchemy import select, update, delete, insert, func, bindparam, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Dict, Optional, Set
+import json
+import time
+import numpy as np
+from app.core.config import WEAK_TOPIC_THRESHOLD
+from app.core.database import AsyncSessionLocal, chunks, upsert_insert
+from app.core.jobs import Job, jobs
+from app.models.test import Answer, TestResult
+from app.models.topic import topic_registry
+from app.models.weak_topic import WeakTopicReport, TopicScore
+from app.services.item_analysis_service import OTHER_OPTION, replace_item_stats
+from app.services.leaderboard_service import invalidate_leaderboard
+from app.services.mastery_service import record_topic_mastery
+from app.services.rollup_service import mark_rollups_stale
+from app.services.test_cache import get_test_definition, invalidate_test
+from app.services.weak_topic_service import generate_recommendation, generate_overall_recommendation
+
+REGRADE_BATCH_SIZE = 10000
+
+# test_id -> running regrade job, so a test is never regraded twice at once in this worker
+_running: Dict[int, Job] = {}
+# Tests whose answer key changed while their regrade was running; it runs again
+_rerun: Set[int] = set()
+
+
+def latest_answer_positions(student_index: np.ndarray, question_index: np.ndarray, num_questions: int) -> np.ndarray:
+    """
+    Positions of the last answer per (student, question) in id-ordered arrays
+    Earlier answers to the same question are superseded by later ones.
+    """
+    keys = student_index.astype(np.int64) * num_questions + question_index
+    _, first_in_reversed = np.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - first_in_reversed
+
+
+async def regrade_test(
+    db: AsyncSession,
+    test_id: int,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Dict:
+    """
+    Regrade the current attempt's answers for a test against its current answer key
+    Answers from earlier attempts are kept as given. Answers are streamed and graded as NumPy arrays in batches. The latest
+    answer per (student, question) then forms a students x questions matrix
+    from which topic tallies, weak topic reports and test results are
+    rebuilt with bulk writes.
+    The test's results rows stay locked until the regrade commits.
+    Submissions lock their student's row before writing answers, so none
+    of them interleave with a regrade.
+    """
+    report = progress or (lambda fraction, message="": None)
+    started = time.perf_counter()
+
+    # A no-op update locks the rows (and takes SQLite's write lock) and
+    # returns the answers versions the stored results will reflect
+    results = TestResult.__table__
+    locked_versions = dict((await db.execute(
+        update(results).where(results.c.test_id == test_id).values(
+            answers_version=results.c.answers_version,
+            updated_at=results.c.updated_at,
+        ).returning(results.c.student_id, results.c.answers_version)
+    )).all())
+
+    # Always grade against the key as stored now
+    invalidate_test(test_id)
+    definition = await get_test_definition(db, test_id)
+    if definition is None:
+        raise ValueError(f"Test {test_id} not found")
+
+    question_ids = np.array(sorted(definition.questions), dtype=np.int64)
+    num_questions = len(question_ids)
+    topics = sorted({topic_id for topic_id, _ in definition.questions.values()})
+    topic_index = {topic_id: i for i, topic_id in enumerate(topics)}
+    topic_names = [topic_registry.name(topic_id) for topic_id in topics]
+    answer_keys = np.array([definition.questions[q][1] for q in question_ids.tolist()], dtype=str)
+    question_topics = np.zeros((num_questions, len(topics)), dtype=np.int32)
+    for i, question_id in enumerate(question_ids.tolist()):
+        question_topics[i, topic_index[definition.questions[question_id][0]]] = 1
+
+    # Only each student's current attempt counts towards analysis
+    current_attempt = (
+        Answer.attempt == func.coalesce(TestResult.attempt, 1),
+        Answer.test_id == test_id,
+    )
+    attempt_join = (TestResult.student_id == Answer.student_id) & (TestResult.test_id == Answer.test_id)
+    total_answers = await db.scalar(
+        select(func.count()).select_from(Answer).outerjoin(TestResult, attempt_join)
+        .where(*current_attempt)
+    )
+    report(0.0, f"Grading {total_answers} answers")
+
+    # Grade answers batch by batch
+    batches = []
+    processed = 0
+    result = await db.stream(
+        select(
+            Answer.id, Answer.student_id, Answer.question_id,
+            Answer.student_answer, Answer.is_correct,
+        ).outerjoin(TestResult, attempt_join).where(*current_attempt).order_by(Answer.id)
+        .execution_options(yield_per=REGRADE_BATCH_SIZE)
+    )
+    async for rows in result.partitions():
+        ids, students, qids, texts, stored = (np.array(column) for column in zip(*rows))
+        positions = np.searchsorted(question_ids, qids)
+        # Answers to questions no longer in the test are left untouched
+        known = positions < num_questions
+        known[known] = question_ids[positions[known]] == qids[known]
+
+        normalized = np.char.lower(np.char.strip(texts[known].astype(str)))
+        grades = (normalized == answer_keys[positions[known]]).astype(np.int8)
+        batches.append((
+            ids[known], students[known], positions[known],
+            grades, stored[known].astype(np.int8), normalized,
+        ))
+
+        processed += len(rows)
+        report(0.6 * processed / max(total_answers, 1), f"Graded {processed}/{total_answers} answers")
+
+    if not batches:
+        await db.commit()
+        return {"test_id": test_id, "answers": 0, "changed": 0, "students": 0,
+                "seconds": round(time.perf_counter() - started, 3)}
+
+    answer_ids, student_ids, question_pos, new_grades, old_grades, answer_texts = (
+        np.concatenate(parts) for parts in zip(*batches)
+    )
+
+    # Persist changed grades
+    changed = np.nonzero(new_grades != old_grades)[0]
+    for chunk in chunks(changed, REGRADE_BATCH_SIZE):
+        await db.execute(update(Answer), [
+            {"id": int(answer_ids[i]), "is_correct": int(new_grades[i])}
+            for i in chunk
+        ])
+    report(0.7, f"Updated {len(changed)} answers")
+
+    # Build students x questions matrices from the latest answers
+    students, student_pos = np.unique(student_ids, return_inverse=True)
+    latest = latest_answer_positions(student_pos, question_pos, num_questions)
+    answered = np.zeros((len(students), num_questions), dtype=np.int32)
+    new_matrix = np.zeros_like(answered)
+    answered[student_pos[latest], question_pos[latest]] = 1
+    new_matrix[student_pos[latest], question_pos[latest]] = new_grades[latest]
+
+    topic_totals = answered @ question_topics
+    topic_correct = new_matrix @ question_topics
+    test_scores = new_matrix.sum(axis=1).astype(np.int64)
+
+    # Overwrite the tallies with the recomputed totals
+    student_list = students.tolist()
+    tallied_topics = (await db.scalars(
+        select(distinct(TopicScore.topic_id)).where(TopicScore.test_id == test_id)
+    )).all()
+    await db.execute(delete(TopicScore).where(TopicScore.test_id == test_id))
+    score_rows = [
+        {
+            "student_id": student_list[s],
+            "test_id": test_id,
+            "topic_id": topics[t],
+            "total_questions": int(topic_totals[s, t]),
+            "correct_answers": int(topic_correct[s, t]),
+        }
+        for s, t in zip(*np.nonzero(topic_totals))
+    ]
+    for chunk in chunks(score_rows, REGRADE_BATCH_SIZE):
+        await db.execute(insert(TopicScore), chunk)
+    await mark_rollups_stale(db, [(test_id, topic_id) for topic_id in {*tallied_topics, *topics}])
+    report(0.8, "Updated topic tallies")
+
+    # Recompute item analysis sums from the new grades
+    question_list = question_ids.tolist()
+    responses = answered.sum(axis=0)
+    stat_rows = [
+        {
+            "question_id": question_list[q],
+            "responses": int(responses[q]),
+            "correct": int(correct),
+            "score_sum": int(score_sum),
+            "score_sq_sum": int(score_sq_sum),
+            "correct_score_sum": int(correct_score_sum),
+        }
+        for q, (correct, score_sum, score_sq_sum, correct_score_sum) in enumerate(zip(
+            new_matrix.sum(axis=0),
+            answered.T @ test_scores,
+            answered.T @ (test_scores * test_scores),
+            new_matrix.T @ test_scores,
+        ))
+        if responses[q]
+    ]
+    option_counts = {}
+    for q, text in zip(question_pos[latest].tolist(), answer_texts[latest].tolist()):
+        options = definition.options.get(question_list[q])
+        if options:
+            key = (question_list[q], text if text in options else OTHER_OPTION)
+            option_counts[key] = option_counts.get(key, 0) + 1
+    await replace_item_stats(db, test_id, stat_rows, [
+        {"question_id": question_id, "option": option, "count": count}
+        for (question_id, option), count in option_counts.items()
+    ])
+
+    # Rebuild weak topic reports and stored results
+    with np.errstate(divide="ignore", invalid="ignore"):
+        topic_percent = np.where(topic_totals > 0, topic_correct * 100.0 / topic_totals, 0.0)
+        overall_totals = topic_totals.sum(axis=1)
+        overall_correct = topic_correct.sum(axis=1)
+        overall_percent = np.where(overall_totals > 0, overall_correct * 100.0 / overall_totals, 0.0)
+
+    report_rows = []
+    result_rows = []
+    for s, student_id in enumerate(student_list):
+        breakdown = {}
+        for t in np.nonzero(topic_totals[s])[0].tolist():
+            score = float(topic_percent[s, t])
+            breakdown[topic_names[t]] = round(score, 2)
+            report_rows.append({
+                "student_id": student_id,
+                "test_id": test_id,
+                "topic_id": topics[t],
+                "score": round(score, 2),
+                "total_questions": int(topic_totals[s, t]),
+                "correct_answers": int(topic_correct[s, t]),
+                "is_weak": 1 if score < WEAK_TOPIC_THRESHOLD else 0,
+                "threshold": WEAK_TOPIC_THRESHOLD,
+                "recommendation": generate_recommendation(topic_names[t], score),
+            })
+        result_rows.append({
+            "b_student_id": student_id,
+            "b_answers_version": locked_versions.get(student_id, 0),
+            "b_overall_score": round(float(overall_percent[s]), 2),
+            "b_total_questions": int(overall_totals[s]),
+            "b_correct_answers": int(overall_correct[s]),
+            "b_score_breakdown": json.dumps(breakdown),
+            "b_recommendation_message": generate_overall_recommendation(float(overall_percent[s])),
+        })
+
+    await db.execute(delete(WeakTopicReport).where(WeakTopicReport.test_id == test_id))
+    for chunk in chunks(report_rows, REGRADE_BATCH_SIZE):
+        await db.execute(insert(WeakTopicReport), chunk)
+    await record_topic_mastery(db, [
+        {key: row[key] for key in ("student_id", "test_id", "topic_id", "score")}
+        for row in report_rows
+    ])
+
+    ensure_results = upsert_insert(db, TestResult).on_conflict_do_nothing(
+        index_elements=["student_id", "test_id"]
+    )
+    for chunk in chunks(student_list, REGRADE_BATCH_SIZE):
+        await db.execute(ensure_results, [
+            {"student_id": student_id, "test_id": test_id, "answers_version": 0, "analyzed_version": -1}
+            for student_id in chunk
+        ])
+
+    store_results = update(results).where(
+        results.c.test_id == test_id,
+        results.c.student_id == bindparam("b_student_id"),
+        # Rows created by a submission since the lock keep their own analysis
+        results.c.answers_version == bindparam("b_answers_version"),
+    ).values(
+        analyzed_version=results.c.answers_version,
+        item_stats_counted=1,
+        overall_score=bindparam("b_overall_score"),
+        total_questions=bindparam("b_total_questions"),
+        correct_answers=bindparam("b_correct_answers"),
+        score_breakdown=bindparam("b_score_breakdown"),
+        recommendation_message=bindparam("b_recommendation_message"),
+    )
+    for chunk in chunks(result_rows, REGRADE_BATCH_SIZE):
+        await db.execute(store_results, chunk)
+
+    await db.commit()
+    invalidate_leaderboard(test_id)
+
+    return {
+        "test_id": test_id,
+        "answers": int(len(answer_ids)),
+        "changed": int(len(changed)),
+        "students": len(student_list),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def start_regrade(test_id: int, owner_id: Optional[int] = None) -> Job:
+    """
+    Regrade a test in the background and return its progress record
+    If the test is already being regraded, that job is returned and runs
+    once more afterwards so the latest answer key is applied.
+    """
+    job = _running.get(test_id)
+    if job is not None and job.status in ("queued", "running"):
+        _rerun.add(test_id)
+        return job
+
+    job = jobs.create("regrade", owner_id=owner_id)
+    _running[test_id] = job
+
+    async def run(job: Job) -> Dict:
+        try:
+            while True:
+                _rerun.discard(test_id)
+                async with AsyncSessionLocal() as db:
+                    result = await regrade_test(db, test_id, job.update)
+                if test_id not in _rerun:
+                    return result
+        finally:
+            _running.pop(test_id, None)
+            _rerun.discard(test_id)
+
+    return jobs.start(job, run)
@@ -0,0 +1,161 @@
+from sqlalchemy import select, delete, func, case, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Tuple
+from datetime import datetime
+import json
+import statistics
+from app.core.config import WEAK_TOPIC_THRESHOLD
+from app.core.database import upsert_insert
+from app.models.test import Test
+from app.models.topic import topic_registry
+from app.models.weak_topic import TopicScore, TopicRollup, TopicRollupChange
+
+# Upper bounds of the score distribution bands (percent)
+SCORE_BUCKET_EDGES = [20, 40, 60, 80]
+
+
+async def mark_rollups_stale(db: AsyncSession, keys: Iterable[Tuple[int, int]]) -> None:
+    """
+    Log (test_id, topic_id) rollups for refresh after their topic tallies change
+    Pairs already in the change log are skipped, so no rollup row is locked
+    here; aggregates are recomputed on read.
+    """
+    rows = [{"test_id": test_id, "topic_id": topic_id} for test_id, topic_id in sorted(set(keys))]
+    if rows:
+        await db.execute(
+            upsert_insert(db, TopicRollupChange).on_conflict_do_nothing(index_elements=["test_id", "topic_id"]),
+            rows,
+        )
+
+
+async def refresh_stale_rollups(db: AsyncSession, test_ids: List[int]) -> int:
+    """
+    Recompute logged rollups for the given tests with one GROUP BY query
+    The logged pairs are deleted before the tallies are read, so a change
+    committed after that read is logged again and picked up next time.
+    """
+    changes = (await db.execute(
+        delete(TopicRollupChange).where(
+            TopicRollupChange.test_id.in_(test_ids)
+        ).returning(TopicRollupChange.test_id, TopicRollupChange.topic_id)
+    )).all()
+    if not changes:
+        await db.commit()
+        return 0
+
+    score = TopicScore.correct_answers * 100.0 / TopicScore.total_questions
+    bucket_columns = [
+        func.sum(case((score < edge, 1), else_=0)).label(f"below_{edge}")
+        for edge in SCORE_BUCKET_EDGES
+    ]
+    columns = [
+        TopicScore.test_id,
+        TopicScore.topic_id,
+        func.count().label("student_count"),
+        func.sum(case((score < WEAK_TOPIC_THRESHOLD, 1), else_=0)).label("weak_count"),
+        func.avg(score).label("mean_score"),
+        *bucket_columns,
+    ]
+    is_postgres = db.bind.dialect.name == "postgresql"
+    if is_postgres:
+        columns.append(func.percentile_cont(0.5).within_group(score).label("median_score"))
+
+    # Sorted so concurrent refreshes write rollup rows in the same order
+    stale_keys = sorted({(row.test_id, row.topic_id) for row in changes})
+    filters = (
+        tuple_(TopicScore.test_id, TopicScore.topic_id).in_(stale_keys),
+        TopicScore.total_questions > 0,
+    )
+    aggregates = {
+        (row.test_id, row.topic_id): row
+        for row in (await db.execute(
+            select(*columns).where(*filters).group_by(TopicScore.test_id, TopicScore.topic_id)
+        )).all()
+    }
+
+    medians = {}
+    if not is_postgres:
+        scores = {}
+        for test_id, topic_id, value in (await db.execute(
+            select(TopicScore.test_id, TopicScore.topic_id, score).where(*filters)
+        )).all():
+            scores.setdefault((test_id, topic_id), []).append(value)
+        medians = {key: statistics.median(values) for key, values in scores.items()}
+
+    now = datetime.utcnow()
+    rows = []
+    for key in stale_keys:
+        values = {
+            "test_id": key[0],
+            "topic_id": key[1],
+            "student_count": 0,
+            "weak_count": 0,
+            "mean_score": 0.0,
+            "median_score": 0.0,
+            "score_buckets": json.dumps([0] * (len(SCORE_BUCKET_EDGES) + 1)),
+            "updated_at": now,
+        }
+        aggregate = aggregates.get(key)
+        if aggregate is not None:
+            # Cumulative "below edge" counts -> per-band counts
+            cumulative = [getattr(aggregate, f"below_{edge}") or 0 for edge in SCORE_BUCKET_EDGES]
+            cumulative.append(aggregate.student_count)
+            buckets = [cumulative[0]] + [
+                cumulative[i] - cumulative[i - 1] for i in range(1, len(cumulative))
+            ]
+            median = aggregate.median_score if is_postgres else medians.get(key)
+            values.update({
+                "student_count": aggregate.student_count,
+                "weak_count": aggregate.weak_count or 0,
+                "mean_score": round(float(aggregate.mean_score or 0), 2),
+                "median_score": round(float(median or 0), 2),
+                "score_buckets": json.dumps(buckets),
+            })
+        rows.append(values)
+
+    stmt = upsert_insert(db, TopicRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["test_id", "topic_id"],
+        set_={
+            column: getattr(stmt.excluded, column)
+            for column in ("student_count", "weak_count", "mean_score", "median_score", "score_buckets", "updated_at")
+        },
+    )
+    await db.execute(stmt, rows)
+    await db.commit()
+    return len(rows)
+
+
+async def get_faculty_topic_rollups(db: AsyncSession, faculty_id: int) -> List[Dict]:
+    """Get per-test, per-topic aggregates for all of a faculty member's tests"""
+    tests = dict((await db.execute(
+        select(Test.id, Test.title).where(Test.created_by == faculty_id)
+    )).all())
+    if not tests:
+        return []
+
+    await refresh_stale_rollups(db, list(tests))
+
+    rollups = (await db.scalars(
+        select(TopicRollup).where(
+            TopicRollup.test_id.in_(list(tests)),
+            TopicRollup.student_count > 0,
+        ).order_by(TopicRollup.test_id, TopicRollup.topic_id)
+    )).all()
+    await topic_registry.ensure(db, {rollup.topic_id for rollup in rollups})
+
+    return [
+        {
+            "test_id": rollup.test_id,
+            "test_title": tests[rollup.test_id],
+            "topic": rollup.topic,
+            "student_count": rollup.student_count,
+            "weak_count": rollup.weak_count,
+            "mean_score": rollup.mean_score,
+            "median_score": rollup.median_score,
+            "score_buckets": json.loads(rollup.score_buckets) if rollup.score_buckets else [],
+            "updated_at": rollup.updated_at,
+        }
+        for rollup in rollups
+    ]
+
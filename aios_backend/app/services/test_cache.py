@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+import json
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from app.core.cache import TTLCache
+from app.core.config import TEST_CACHE_TTL, TEST_CACHE_SIZE
+from app.models.test import Test, Question
+from app.models.topic import topic_registry
+from app.schemas import TestResponse
+
+
+@dataclass(frozen=True)
+class TestDefinition:
+    """Immutable snapshot of a test used for serving and grading"""
+    test_id: int
+    version: datetime  # Test.updated_at when the snapshot was taken; question changes bump it
+    created_by: int
+    questions: Dict[int, Tuple[int, str]]  # question_id -> (topic_id, normalized correct answer)
+    options: Dict[int, Tuple[str, ...]]  # question_id -> normalized options, for multiple choice questions
+    response_body: bytes  # Pre-serialized TestResponse JSON
+
+
+# Test definitions keyed by (test id, version)
+test_cache = TTLCache(maxsize=TEST_CACHE_SIZE, ttl=TEST_CACHE_TTL)
+
+
+def normalize_answer(answer: str) -> str:
+    """Normalize an answer for comparison (case-insensitive, trimmed)"""
+    return answer.strip().lower()
+
+
+def parse_options(options: Optional[str]) -> Tuple[str, ...]:
+    """Normalized option texts from a question's JSON options (a list, or a dict of label -> text)"""
+    if not options:
+        return ()
+    try:
+        parsed = json.loads(options)
+    except ValueError:
+        return ()
+    if isinstance(parsed, dict):
+        parsed = list(parsed.values())
+    if not isinstance(parsed, list):
+        return ()
+    return tuple(normalize_answer(str(option)) for option in parsed)
+
+
+def build_test_definition(test: Test) -> TestDefinition:
+    """Build a cache entry from a test with its questions loaded"""
+    return TestDefinition(
+        test_id=test.id,
+        version=test.updated_at,
+        created_by=test.created_by,
+        questions={
+            question.id: (question.topic_id, normalize_answer(question.correct_answer))
+            for question in test.questions
+        },
+        options={
+            question.id: options
+            for question in test.questions
+            if (options := parse_options(question.options))
+        },
+        response_body=TestResponse.model_validate(test).model_dump_json().encode(),
+    )
+
+
+def bump_test_versions(test_ids: Iterable[int]):
+    """Statement moving tests to a new version, for question writes that bypass the ORM"""
+    return update(Test).where(Test.id.in_(set(test_ids))).values(updated_at=datetime.utcnow())
+
+
+async def get_test_definition(db: AsyncSession, test_id: int) -> Optional[TestDefinition]:
+    """
+    Get a test definition from the cache, loading it on a miss
+    The current version is read first, a primary key lookup, so a change
+    committed by any worker is picked up on the next call.
+    """
+    version = await db.scalar(select(Test.updated_at).where(Test.id == test_id))
+    if version is None:
+        return None
+    definition = test_cache.get((test_id, version))
+    if definition is not None:
+        return definition
+
+    test = await db.scalar(
+        select(Test).options(selectinload(Test.questions)).where(Test.id == test_id)
+    )
+    if test is None:
+        return None
+
+    await topic_registry.ensure(db, {question.topic_id for question in test.questions})
+    definition = build_test_definition(test)
+    test_cache.set((test_id, definition.version), definition)
+    return definition
+
+
+def invalidate_test(test_id: int):
+    """Drop every cached version of a test definition"""
+    test_cache.invalidate(lambda key: key[0] == test_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_changed_test_versions(session, flush_context, instances):
+    """Give a test a new version when its questions are added, edited or deleted"""
+    test_ids = {
+        obj.test_id for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Question) and obj.test_id is not None
+    }
+    if test_ids:
+        session.execute(bump_test_versions(test_ids))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tests(session, flush_context):
+    """Remember tests whose definition changed in this transaction"""
+    changed = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Test):
+            changed.add(obj.id)
+        elif isinstance(obj, Question):
+            changed.add(obj.test_id)
+    if changed:
+        session.info.setdefault("changed_test_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_tests(session):
+    for test_id in session.info.pop("changed_test_ids", ()):
+        invalidate_test(test_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tests(session):
+    session.info.pop("changed_test_ids", None)
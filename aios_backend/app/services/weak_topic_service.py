@@ -1,87 +1,304 @@
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from sqlalchemy import select, insert, delete, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Tuple
+from datetime import datetime
 import json
-from app.models.test import Test, Question, Answer
-from app.models.weak_topic import WeakTopicReport
+from app.models.test import Test, Question, Answer, TestResult
+from app.models.topic import topic_registry
+from app.models.weak_topic import WeakTopicReport, TopicScore
 from app.core.config import WEAK_TOPIC_THRESHOLD
+from app.core.database import upsert_insert
+from app.services.item_analysis_service import record_item_responses
+from app.services.leaderboard_service import invalidate_leaderboard
+from app.services.mastery_service import record_topic_mastery
+from app.services.rollup_service import mark_rollups_stale
+from app.services.test_cache import get_test_definition, normalize_answer
 
 
-def compare_answers(db: Session, student_id: int, test_id: int) -> Dict:
+def grade_answer(student_answer: str, normalized_correct_answer: str) -> int:
+    """Return 1 if the student's answer matches the normalized correct answer, else 0"""
+    return int(normalize_answer(student_answer) == normalized_correct_answer)
+
+
+async def record_graded_answers(
+    db: AsyncSession,
+    student_id: int,
+    test_id: int,
+    answers: List[Tuple[int, str]],
+    questions: Dict[int, Tuple[int, str]],
+) -> None:
+    """
+    Grade answers as they are stored and fold them into the per-topic tallies
+    answers: [(question_id, student_answer)] in submission order
+    questions: {question_id: (topic_id, normalized_correct_answer)} for every answered question
+    Answers are upserted into the student's current attempt, so a re-answered
+    question replaces its previous answer and grade instead of adding a row.
+    """
+    if not answers:
+        return
+    
+    # Also locks the result row, serializing concurrent submissions for this student's test
+    attempt = await bump_answers_version(db, student_id, test_id)
+    
+    # Submissions made before write-time grading have no tallies yet
+    has_scores = await db.scalar(
+        select(TopicScore.id).where(
+            TopicScore.student_id == student_id,
+            TopicScore.test_id == test_id,
+        ).limit(1)
+    )
+    if has_scores is None:
+        await rebuild_topic_scores(db, student_id, test_id, attempt)
+    
+    # Stored grade and answer for each question already answered in this attempt
+    previous = {
+        question_id: (is_correct, student_answer)
+        for question_id, is_correct, student_answer in (await db.execute(
+            select(Answer.question_id, Answer.is_correct, Answer.student_answer).where(
+                Answer.student_id == student_id,
+                Answer.test_id == test_id,
+                Answer.attempt == attempt,
+            ).order_by(Answer.id)
+        )).all()
+    }
+    latest = dict(previous)
+    
+    # The last answer to a question within one submission wins
+    submitted = {}
+    for question_id, student_answer in answers:
+        submitted[question_id] = student_answer
+    
+    answer_rows = []
+    topic_deltas = {}
+    for question_id, student_answer in submitted.items():
+        topic_id, correct_answer = questions[question_id]
+        is_correct = grade_answer(student_answer, correct_answer)
+        
+        delta = topic_deltas.setdefault(topic_id, {"total": 0, "correct": 0})
+        if question_id in latest:
+            delta["correct"] += is_correct - latest[question_id][0]
+        else:
+            delta["total"] += 1
+            delta["correct"] += is_correct
+        latest[question_id] = (is_correct, student_answer)
+        
+        answer_rows.append({
+            "question_id": question_id,
+            "student_id": student_id,
+            "test_id": test_id,
+            "attempt": attempt,
+            "student_answer": student_answer,
+            "is_correct": is_correct,
+        })
+    
+    await upsert_answers(db, answer_rows)
+    await record_item_responses(db, student_id, test_id, previous, latest)
+    
+    await increment_topic_scores(db, [
+        {
+            "student_id": student_id,
+            "test_id": test_id,
+            "topic_id": topic_id,
+            "total_questions": delta["total"],
+            "correct_answers": delta["correct"],
+        }
+        for topic_id, delta in topic_deltas.items()
+        if delta["total"] or delta["correct"]
+    ])
+    
+    await db.commit()
+
+
+async def upsert_answers(db: AsyncSession, rows: List[Dict]) -> None:
+    """
+    Store answers, overwriting the student's earlier answer to the same question in the same attempt
+    rows: [{question_id, student_id, test_id, attempt, student_answer, is_correct}]
+    """
+    if not rows:
+        return
+    
+    now = datetime.utcnow()
+    stmt = upsert_insert(db, Answer)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "question_id", "attempt"],
+        set_={
+            "student_answer": stmt.excluded.student_answer,
+            "is_correct": stmt.excluded.is_correct,
+            "created_at": stmt.excluded.created_at,
+        },
+    )
+    await db.execute(stmt, [{**row, "created_at": now} for row in rows])
+
+
+async def increment_topic_scores(db: AsyncSession, rows: List[Dict]) -> None:
     """
-    Compare student answers with correct answers and calculate scores per topic
-    Returns score breakdown and weak topics
+    Add total/correct deltas to per-topic tallies, creating missing rows
+    rows: [{student_id, test_id, topic_id, total_questions, correct_answers}]
     """
+    if not rows:
+        return
+    
+    now = datetime.utcnow()
+    stmt = upsert_insert(db, TopicScore)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "test_id", "topic_id"],
+        set_={
+            "total_questions": TopicScore.total_questions + stmt.excluded.total_questions,
+            "correct_answers": TopicScore.correct_answers + stmt.excluded.correct_answers,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await db.execute(stmt, [{**row, "updated_at": now} for row in rows])
+    await mark_rollups_stale(db, [(row["test_id"], row["topic_id"]) for row in rows])
+
+
+async def bump_answers_version(db: AsyncSession, student_id: int, test_id: int) -> int:
+    """
+    Mark a student's stored analysis as stale after new answers arrive
+    Returns the student's current attempt
+    """
+    stmt = upsert_insert(db, TestResult).values(
+        student_id=student_id,
+        test_id=test_id,
+        answers_version=1,
+        analyzed_version=-1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "test_id"],
+        set_={"answers_version": TestResult.answers_version + 1},
+    )
+    return await db.scalar(stmt.returning(TestResult.attempt))
+
+
+async def get_current_attempt(db: AsyncSession, student_id: int, test_id: int) -> int:
+    """Get the attempt a student's answers for a test are currently stored under"""
+    attempt = await db.scalar(
+        select(TestResult.attempt).where(
+            TestResult.student_id == student_id,
+            TestResult.test_id == test_id,
+        )
+    )
+    return attempt or 1
+
+
+async def rebuild_topic_scores(db: AsyncSession, student_id: int, test_id: int, attempt: int = None) -> Dict:
+    """
+    Regrade a student's stored answers from scratch and rewrite their topic tallies
+    Used to backfill answers stored before grading moved to write time, and
+    to reset the tallies when a new attempt starts
+    """
+    if attempt is None:
+        attempt = await get_current_attempt(db, student_id, test_id)
+    
     # Get all questions in the test
-    questions = db.query(Question).filter(Question.test_id == test_id).all()
+    definition = await get_test_definition(db, test_id)
+    questions = definition.questions if definition else {}
     
-    # Get all student answers for this test
-    answers = db.query(Answer).filter(
-        Answer.student_id == student_id,
-        Answer.test_id == test_id
-    ).all()
+    # Get the student's answers in the current attempt
+    answers = (await db.scalars(
+        select(Answer).where(
+            Answer.student_id == student_id,
+            Answer.test_id == test_id,
+            Answer.attempt == attempt,
+        ).order_by(Answer.id)
+    )).all()
     
-    # Create a mapping of question_id to answer
+    # Create a mapping of question_id to latest answer
     answer_map = {answer.question_id: answer for answer in answers}
     
     # Calculate scores per topic
     topic_scores = {}
-    for question in questions:
-        if question.id not in answer_map:
+    for question_id, (topic_id, correct_answer) in questions.items():
+        if question_id not in answer_map:
             continue
         
-        answer = answer_map[question.id]
-        topic = question.topic
+        answer = answer_map[question_id]
+        data = topic_scores.setdefault(topic_id, {"total": 0, "correct": 0})
         
-        if topic not in topic_scores:
-            topic_scores[topic] = {
-                "total": 0,
-                "correct": 0,
-                "questions": []
+        is_correct = grade_answer(answer.student_answer, correct_answer)
+        data["total"] += 1
+        data["correct"] += is_correct
+        if answer.is_correct != is_correct:
+            answer.is_correct = is_correct
+    
+    replaced = (await db.scalars(
+        delete(TopicScore).where(
+            TopicScore.student_id == student_id,
+            TopicScore.test_id == test_id,
+        ).returning(TopicScore.topic_id)
+    )).all()
+    await mark_rollups_stale(db, [(test_id, topic_id) for topic_id in {*replaced, *topic_scores}])
+    if topic_scores:
+        await db.execute(insert(TopicScore), [
+            {
+                "student_id": student_id,
+                "test_id": test_id,
+                "topic_id": topic_id,
+                "total_questions": data["total"],
+                "correct_answers": data["correct"],
             }
-        
-        topic_scores[topic]["total"] += 1
-        topic_scores[topic]["questions"].append(question.id)
-        
-        # Simple comparison (case-insensitive, trimmed)
-        is_correct = (
-            answer.student_answer.strip().lower() == 
-            question.correct_answer.strip().lower()
+            for topic_id, data in topic_scores.items()
+        ])
+    await db.flush()
+    
+    return topic_scores
+
+
+async def compare_answers(db: AsyncSession, student_id: int, test_id: int) -> Dict:
+    """
+    Get score totals per topic id for a student's test
+    Answers are graded when stored, so this reads the per-topic tallies
+    instead of re-grading every answer
+    """
+    scores = (await db.scalars(
+        select(TopicScore).where(
+            TopicScore.student_id == student_id,
+            TopicScore.test_id == test_id,
         )
-        
-        if is_correct:
-            topic_scores[topic]["correct"] += 1
-            answer.is_correct = 1
-        else:
-            answer.is_correct = 0
-        
-        db.add(answer)
+    )).all()
     
-    db.commit()
+    if not scores:
+        return await rebuild_topic_scores(db, student_id, test_id)
     
-    return topic_scores
+    return {
+        score.topic_id: {
+            "total": score.total_questions,
+            "correct": score.correct_answers,
+        }
+        for score in scores
+    }
 
 
 def calculate_score_breakdown(topic_scores: Dict) -> Dict:
-    """Calculate percentage scores for each topic"""
+    """Calculate percentage scores for each topic, keyed by topic name"""
     breakdown = {}
-    for topic, data in topic_scores.items():
+    for topic_id, data in topic_scores.items():
         if data["total"] > 0:
             percentage = (data["correct"] / data["total"]) * 100
-            breakdown[topic] = round(percentage, 2)
+            breakdown[topic_registry.name(topic_id)] = round(percentage, 2)
     return breakdown
 
 
-def identify_weak_topics(
-    db: Session,
+async def identify_weak_topics(
+    db: AsyncSession,
     student_id: int,
     test_id: int,
     topic_scores: Dict,
     threshold: float = WEAK_TOPIC_THRESHOLD,
 ) -> List[WeakTopicReport]:
-    """Identify topics where score is below threshold"""
+    """
+    Identify topics where score is below threshold
+    Replaces the student's previous reports for this test
+    """
+    await db.execute(
+        delete(WeakTopicReport).where(
+            WeakTopicReport.student_id == student_id,
+            WeakTopicReport.test_id == test_id,
+        )
+    )
     weak_topics = []
     
-    for topic, data in topic_scores.items():
+    for topic_id, data in topic_scores.items():
         if data["total"] == 0:
             continue
         
@@ -89,13 +306,13 @@ def identify_weak_topics(
         is_weak = 1 if score_percentage < threshold else 0
         
         # Generate recommendation
-        recommendation = generate_recommendation(topic, score_percentage)
+        recommendation = generate_recommendation(topic_registry.name(topic_id), score_percentage)
         
         # Create weak topic report
         report = WeakTopicReport(
             student_id=student_id,
             test_id=test_id,
-            topic=topic,
+            topic_id=topic_id,
             score=round(score_percentage, 2),
             total_questions=data["total"],
             correct_answers=data["correct"],
@@ -106,7 +323,13 @@ def identify_weak_topics(
         db.add(report)
         weak_topics.append(report)
     
-    db.commit()
+    await db.flush()
+    
+    # Extend the student's mastery series for each topic
+    await record_topic_mastery(db, [
+        {"student_id": student_id, "test_id": test_id, "topic_id": report.topic_id, "score": report.score}
+        for report in weak_topics
+    ])
     
     # Filter only weak topics
     return [t for t in weak_topics if t.is_weak == 1]
@@ -124,20 +347,100 @@ def generate_recommendation(topic: str, score: float) -> str:
         return f"Good: Keep practicing {topic} to maintain and improve."
 
 
-def get_test_analysis(
-    db: Session,
+def generate_overall_recommendation(overall_score: float) -> str:
+    """Generate overall recommendation based on test score"""
+    if overall_score < 50:
+        return "You need significant improvement. Focus on weak topics and practice regularly."
+    elif overall_score < 70:
+        return "Good effort! Review the weak topics and practice more to improve."
+    elif overall_score < 85:
+        return "Great performance! Continue with consistent practice to reach excellence."
+    else:
+        return "Excellent! You have mastered the content. Help peers and take advanced topics."
+
+
+def format_test_analysis(result: TestResult, weak_topics: List[WeakTopicReport]) -> Dict:
+    """Shape a stored test result as the analysis response"""
+    return {
+        "test_id": result.test_id,
+        "overall_score": result.overall_score,
+        "total_questions": result.total_questions,
+        "correct_answers": result.correct_answers,
+        "weak_topics": weak_topics,
+        "score_breakdown": json.loads(result.score_breakdown) if result.score_breakdown else {},
+        "recommendation_message": result.recommendation_message,
+        "attempt": result.attempt,
+    }
+
+
+async def get_test_result(
+    db: AsyncSession,
+    student_id: int,
+    test_id: int,
+    for_update: bool = False,
+) -> TestResult:
+    """Get the stored analysis row for a student's test"""
+    stmt = select(TestResult).where(
+        TestResult.student_id == student_id,
+        TestResult.test_id == test_id,
+    )
+    if for_update:
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
+    return await db.scalar(stmt)
+
+
+async def get_stored_weak_topics(db: AsyncSession, student_id: int, test_id: int) -> List[WeakTopicReport]:
+    """Get the weak topic reports from the latest analysis"""
+    reports = (await db.scalars(
+        select(WeakTopicReport).where(
+            WeakTopicReport.student_id == student_id,
+            WeakTopicReport.test_id == test_id,
+            WeakTopicReport.is_weak == 1,
+        ).order_by(WeakTopicReport.id)
+    )).all()
+    await topic_registry.ensure(db, {report.topic_id for report in reports})
+    return reports
+
+
+async def get_test_analysis(
+    db: AsyncSession,
     student_id: int,
     test_id: int,
 ) -> Dict:
-    """Get comprehensive test analysis for a student"""
+    """
+    Get comprehensive test analysis for a student
+    The analysis is stored once per answer-set version and served from
+    test_results until new answers are submitted
+    """
+    result = await get_test_result(db, student_id, test_id)
+    if result is not None and result.analyzed_version == result.answers_version:
+        weak_topics_list = await get_stored_weak_topics(db, student_id, test_id)
+        return format_test_analysis(result, weak_topics_list)
+    
+    # Lock the result row so concurrent readers don't analyze twice
+    if result is None:
+        stmt = upsert_insert(db, TestResult).values(
+            student_id=student_id,
+            test_id=test_id,
+            answers_version=0,
+            analyzed_version=-1,
+        ).on_conflict_do_nothing(index_elements=["student_id", "test_id"])
+        await db.execute(stmt)
+    result = await get_test_result(db, student_id, test_id, for_update=True)
+    if result.analyzed_version == result.answers_version:
+        weak_topics_list = await get_stored_weak_topics(db, student_id, test_id)
+        await db.commit()
+        return format_test_analysis(result, weak_topics_list)
+    
     # Compare answers and get topic scores
-    topic_scores = compare_answers(db, student_id, test_id)
+    topic_scores = await compare_answers(db, student_id, test_id)
+    await topic_registry.ensure(db, topic_scores)
     
     # Calculate score breakdown
     score_breakdown = calculate_score_breakdown(topic_scores)
     
     # Identify weak topics
-    weak_topics_list = identify_weak_topics(db, student_id, test_id, topic_scores)
+    weak_topics_list = await identify_weak_topics(db, student_id, test_id, topic_scores)
     
     # Calculate overall score
     total_questions = sum(data["total"] for data in topic_scores.values())
@@ -147,40 +450,110 @@ def get_test_analysis(
         if total_questions > 0 else 0
     )
     
-    # Generate overall recommendation
-    if overall_score < 50:
-        recommendation_message = "You need significant improvement. Focus on weak topics and practice regularly."
-    elif overall_score < 70:
-        recommendation_message = "Good effort! Review the weak topics and practice more to improve."
-    elif overall_score < 85:
-        recommendation_message = "Great performance! Continue with consistent practice to reach excellence."
-    else:
-        recommendation_message = "Excellent! You have mastered the content. Help peers and take advanced topics."
+    # Store the analysis for this answer-set version
+    result.analyzed_version = result.answers_version
+    result.overall_score = round(overall_score, 2)
+    result.total_questions = total_questions
+    result.correct_answers = correct_answers
+    result.score_breakdown = json.dumps(score_breakdown)
+    result.recommendation_message = generate_overall_recommendation(overall_score)
+    await db.commit()
+    invalidate_leaderboard(test_id)
     
-    return {
-        "test_id": test_id,
-        "overall_score": round(overall_score, 2),
-        "total_questions": total_questions,
-        "correct_answers": correct_answers,
-        "weak_topics": weak_topics_list,
-        "score_breakdown": score_breakdown,
-        "recommendation_message": recommendation_message,
-    }
+    return format_test_analysis(result, weak_topics_list)
 
 
-def get_faculty_weak_topics(db: Session, faculty_id: int):
-    """Get weak topics for all students of a faculty's tests"""
-    # Get all tests created by faculty
-    tests = db.query(Test).filter(Test.created_by == faculty_id).all()
-    test_ids = [t.id for t in tests]
+async def start_new_attempt(db: AsyncSession, student_id: int, test_id: int) -> int:
+    """
+    Start a fresh attempt at a test for a student and return its number
+    Earlier attempts stay stored; tallies, item statistics and the analysis
+    only cover answers given in the new attempt. While the current attempt
+    has no answers yet, its number is returned instead of starting another.
+    """
+    has_answers = exists().where(
+        Answer.student_id == TestResult.student_id,
+        Answer.test_id == TestResult.test_id,
+        Answer.attempt == TestResult.attempt,
+    )
+    stmt = upsert_insert(db, TestResult).values(
+        student_id=student_id,
+        test_id=test_id,
+        answers_version=1,
+        analyzed_version=-1,
+        attempt=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "test_id"],
+        set_={
+            "attempt": TestResult.attempt + 1,
+            "answers_version": TestResult.answers_version + 1,
+        },
+        where=has_answers,
+    )
+    attempt = await db.scalar(stmt.returning(TestResult.attempt))
+    if attempt is None:
+        await db.rollback()
+        return await db.scalar(
+            select(TestResult.attempt).where(
+                TestResult.student_id == student_id,
+                TestResult.test_id == test_id,
+            )
+        )
     
-    if not test_ids:
-        return []
+    if attempt > 1:
+        previous = {
+            question_id: (is_correct, student_answer)
+            for question_id, is_correct, student_answer in (await db.execute(
+                select(Answer.question_id, Answer.is_correct, Answer.student_answer).where(
+                    Answer.student_id == student_id,
+                    Answer.test_id == test_id,
+                    Answer.attempt == attempt - 1,
+                ).order_by(Answer.id)
+            )).all()
+        }
+        await record_item_responses(db, student_id, test_id, previous, {})
+        await rebuild_topic_scores(db, student_id, test_id, attempt)
     
-    # Get all weak topic reports for these tests
-    weak_topics = db.query(WeakTopicReport).filter(
-        WeakTopicReport.test_id.in_(test_ids),
-        WeakTopicReport.is_weak == 1
-    ).all()
+    await db.commit()
+    return attempt
+
+
+async def get_faculty_weak_topics(
+    db: AsyncSession,
+    faculty_id: int,
+    test_id: int = None,
+    topic: str = None,
+    after: int = None,
+    limit: int = 20,
+) -> Dict:
+    """
+    Get one page of weak topic reports for students of a faculty's tests
+    Reports are ordered by ID; pass next_cursor as `after` for the next page
+    """
+    stmt = select(WeakTopicReport).join(
+        Test, Test.id == WeakTopicReport.test_id
+    ).where(
+        Test.created_by == faculty_id,
+        WeakTopicReport.is_weak == 1,
+    )
+    if test_id is not None:
+        stmt = stmt.where(WeakTopicReport.test_id == test_id)
+    if topic is not None:
+        topic_ids = await topic_registry.lookup(db, [topic])
+        if topic not in topic_ids:
+            return {"items": [], "next_cursor": None}
+        stmt = stmt.where(WeakTopicReport.topic_id == topic_ids[topic])
+    if after is not None:
+        stmt = stmt.where(WeakTopicReport.id > after)
     
-    return weak_topics
+    weak_topics = (await db.scalars(
+        stmt.order_by(WeakTopicReport.id).limit(limit + 1)
+    )).all()
+    
+    has_more = len(weak_topics) > limit
+    weak_topics = weak_topics[:limit]
+    await topic_registry.ensure(db, {report.topic_id for report in weak_topics})
+    return {
+        "items": weak_topics,
+        "next_cursor": weak_topics[-1].id if has_more else None,
+    }
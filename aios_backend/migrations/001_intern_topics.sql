@@ -0,0 +1,35 @@
+-- Move topic names into a dictionary table and reference them by integer id.
+-- New databases get this schema from init_db(). Run this once (PostgreSQL)
+-- on databases created before the topics table existed, before or after
+-- init_db() has created the tables added since:
+--   psql "$DATABASE_URL" -f migrations/001_intern_topics.sql
+-- Only questions and weak_topic_reports predate topic ids; every later
+-- table that references a topic is created by init_db() with topic_id.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS topics (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+-- Names are stored trimmed, matching the Topic name setter
+INSERT INTO topics (name)
+SELECT TRIM(topic) FROM questions
+UNION SELECT TRIM(topic) FROM weak_topic_reports
+ON CONFLICT (name) DO NOTHING;
+
+-- questions
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS topic_id INTEGER REFERENCES topics (id);
+UPDATE questions SET topic_id = topics.id FROM topics WHERE topics.name = TRIM(questions.topic);
+ALTER TABLE questions ALTER COLUMN topic_id SET NOT NULL;
+ALTER TABLE questions DROP COLUMN topic;
+
+-- weak_topic_reports
+ALTER TABLE weak_topic_reports ADD COLUMN IF NOT EXISTS topic_id INTEGER REFERENCES topics (id);
+UPDATE weak_topic_reports SET topic_id = topics.id FROM topics WHERE topics.name = TRIM(weak_topic_reports.topic);
+ALTER TABLE weak_topic_reports ALTER COLUMN topic_id SET NOT NULL;
+ALTER TABLE weak_topic_reports DROP COLUMN topic;
+CREATE INDEX IF NOT EXISTS ix_weak_topic_reports_test_topic ON weak_topic_reports (test_id, topic_id);
+
+COMMIT;
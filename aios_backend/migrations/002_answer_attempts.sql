@@ -0,0 +1,23 @@
+-- Store answers per attempt, one row per (student, question, attempt).
+-- New databases get this schema from init_db(). Run this once (PostgreSQL)
+-- on databases created before attempts existed, before or after init_db()
+-- has created the tables added since:
+--   psql "$DATABASE_URL" -f migrations/002_answer_attempts.sql
+
+BEGIN;
+
+-- test_results may not exist yet; init_db() creates it with attempt
+ALTER TABLE IF EXISTS test_results ADD COLUMN IF NOT EXISTS attempt INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE answers ADD COLUMN IF NOT EXISTS attempt INTEGER NOT NULL DEFAULT 1;
+
+-- Resubmissions used to append rows; only the latest answer per question counted
+DELETE FROM answers a
+USING answers b
+WHERE a.student_id = b.student_id
+  AND a.question_id = b.question_id
+  AND a.id < b.id;
+
+ALTER TABLE answers ADD CONSTRAINT uq_answers_student_question_attempt
+    UNIQUE (student_id, question_id, attempt);
+
+COMMIT;
@@ -0,0 +1,6 @@
+-- Index GDPI responses for per-student history pages.
+-- New databases get this index from init_db(); run this once (PostgreSQL)
+-- on databases created before it existed:
+--   psql "$DATABASE_URL" -f migrations/003_gdpi_response_history_index.sql
+
+CREATE INDEX IF NOT EXISTS ix_gdpi_responses_student_id ON gdpi_responses (student_id, id);
@@ -0,0 +1,7 @@
+-- Track whether a stored analysis is counted in the item analysis sums.
+-- New databases get this column from init_db(). Run this once (PostgreSQL)
+-- on databases whose test_results table predates item analysis:
+--   psql "$DATABASE_URL" -f migrations/004_test_result_item_stats.sql
+-- A regrade of each test then backfills question_stats for its answers.
+
+ALTER TABLE IF EXISTS test_results ADD COLUMN IF NOT EXISTS item_stats_counted INTEGER NOT NULL DEFAULT 0;